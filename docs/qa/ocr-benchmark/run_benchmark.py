@@ -4,15 +4,63 @@ OCR Benchmark Runner for AssistSupport
 Evaluates Vision OCR accuracy using Word Error Rate (WER)
 """
 
+import argparse
+import asyncio
+import hashlib
 import json
 import os
 import subprocess
 import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from jiwer import wer, cer
+import jiwer
 
-def run_ocr(image_path: str, vision_ocr_path: str) -> tuple[str, float]:
+def ocr_cache_key(image_path: str, vision_ocr_path: str) -> str:
+    """Key OCR output by image content and helper binary version (mtime)"""
+    digest = hashlib.blake2b(Path(image_path).read_bytes(), digest_size=16).hexdigest()
+    return f"{digest}:{os.path.getmtime(vision_ocr_path)}"
+
+def run_ocr(image_path: str, vision_ocr_path: str, cache: dict | None = None) -> tuple[str, float]:
     """Run Vision OCR on an image and return (text, confidence)"""
+    key = None
+    if cache is not None:
+        key = ocr_cache_key(image_path, vision_ocr_path)
+        if key in cache:
+            text, confidence = cache[key]
+            return text, confidence
+
+    text, confidence = _run_vision_ocr(image_path, vision_ocr_path)
+    # Don't cache helper failures so they are retried on the next run
+    if key is not None and text:
+        cache[key] = (text, confidence)
+    return text, confidence
+
+async def run_ocr_async(
+    image_path: str, vision_ocr_path: str, sem: asyncio.Semaphore, cache: dict | None = None
+) -> tuple[str, float]:
+    """asyncio variant of run_ocr; sem bounds the number of helpers in flight"""
+    key = None
+    if cache is not None:
+        key = ocr_cache_key(image_path, vision_ocr_path)
+        if key in cache:
+            text, confidence = cache[key]
+            return text, confidence
+
+    async with sem:
+        text, confidence = await _run_vision_ocr_async(image_path, vision_ocr_path)
+    if key is not None and text:
+        cache[key] = (text, confidence)
+    return text, confidence
+
+def _parse_ocr_output(stdout: str) -> tuple[str, float]:
+    """Parse the helper's JSON output into (text, mean confidence)"""
+    data = json.loads(stdout)
+    if data.get("success"):
+        return data.get("fullText", ""), sum(r.get("confidence", 0) for r in data.get("results", [])) / max(len(data.get("results", [])), 1)
+    return "", 0.0
+
+def _run_vision_ocr(image_path: str, vision_ocr_path: str) -> tuple[str, float]:
+    """Invoke the Vision OCR helper binary"""
     try:
         result = subprocess.run(
             [vision_ocr_path, image_path],
@@ -23,20 +71,163 @@ def run_ocr(image_path: str, vision_ocr_path: str) -> tuple[str, float]:
         if result.returncode != 0:
             return "", 0.0
 
-        data = json.loads(result.stdout)
-        if data.get("success"):
-            return data.get("fullText", ""), sum(r.get("confidence", 0) for r in data.get("results", [])) / max(len(data.get("results", [])), 1)
-        return "", 0.0
+        return _parse_ocr_output(result.stdout)
     except Exception as e:
         print(f"  Error processing {image_path}: {e}")
         return "", 0.0
 
+async def _run_vision_ocr_async(image_path: str, vision_ocr_path: str) -> tuple[str, float]:
+    """Invoke the Vision OCR helper binary without blocking the event loop"""
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            vision_ocr_path,
+            image_path,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        try:
+            stdout, _ = await asyncio.wait_for(proc.communicate(), timeout=30)
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+            raise
+        if proc.returncode != 0:
+            return "", 0.0
+
+        return _parse_ocr_output(stdout.decode())
+    except Exception as e:
+        print(f"  Error processing {image_path}: {e!r}")
+        return "", 0.0
+
+def _load_ground_truth(image_path: Path, gt_dir: Path) -> str | None:
+    """Read an image's ground truth, or None if it has none"""
+    gt_path = gt_dir / (image_path.stem + ".txt")
+
+    if not gt_path.exists():
+        return None
+
+    return gt_path.read_text().strip()
+
+def _make_sample(image_path: Path, ground_truth: str, ocr_text: str, confidence: float) -> dict:
+    """Bundle one image's OCR output for scoring"""
+    # Determine image type from filename
+    is_image_only = any(
+        image_path.name.startswith(prefix) and int(image_path.stem.split("_")[1]) <= threshold
+        for prefix, threshold in [
+            ("error_", 8),
+            ("instruction_", 3),
+            ("technical_", 3),
+            ("network_", 2),
+            ("multiline_", 4),
+        ]
+    )
+
+    return {
+        "image": image_path.name,
+        "ground_truth": ground_truth,
+        "ocr_text": ocr_text.strip(),
+        "confidence": confidence,
+        "is_image_only": is_image_only,
+    }
+
+def process_one(
+    image_path: Path, gt_dir: Path, vision_ocr_path: str, cache: dict | None = None
+) -> dict | None:
+    """Run OCR on one image, or return None if it has no ground truth"""
+    ground_truth = _load_ground_truth(image_path, gt_dir)
+    if ground_truth is None:
+        return None
+
+    ocr_text, confidence = run_ocr(str(image_path), vision_ocr_path, cache)
+    return _make_sample(image_path, ground_truth, ocr_text, confidence)
+
+async def process_one_async(
+    image_path: Path,
+    gt_dir: Path,
+    vision_ocr_path: str,
+    sem: asyncio.Semaphore,
+    cache: dict | None = None,
+) -> dict | None:
+    """asyncio variant of process_one"""
+    ground_truth = _load_ground_truth(image_path, gt_dir)
+    if ground_truth is None:
+        return None
+
+    ocr_text, confidence = await run_ocr_async(str(image_path), vision_ocr_path, sem, cache)
+    return _make_sample(image_path, ground_truth, ocr_text, confidence)
+
+async def collect_samples_async(
+    image_files: list[Path], gt_dir: Path, vision_ocr_path: str, cache: dict | None = None
+) -> list[dict | None]:
+    """Run OCR for all images with up to cpu_count helper processes in flight"""
+    sem = asyncio.Semaphore(os.cpu_count() or 1)
+    return await asyncio.gather(
+        *(process_one_async(p, gt_dir, vision_ocr_path, sem, cache) for p in image_files)
+    )
+
+def _per_sample_error_rates(output) -> list[float]:
+    """Split a batched jiwer alignment into per-sample (S + D + I) / N rates"""
+    rates = []
+    for reference, alignment in zip(output.references, output.alignments):
+        errors = 0
+        for chunk in alignment:
+            if chunk.type == "insert":
+                errors += chunk.hyp_end_idx - chunk.hyp_start_idx
+            elif chunk.type != "equal":
+                errors += chunk.ref_end_idx - chunk.ref_start_idx
+        rates.append(errors / len(reference))
+    return rates
+
+def score_samples(samples: list[dict]) -> list[dict]:
+    """Compute WER/CER for all samples with one jiwer alignment pass per metric"""
+    # Empty ground truth or OCR output counts as 100% error
+    scorable = [s for s in samples if s["ground_truth"] and s["ocr_text"]]
+    wers, cers = {}, {}
+    if scorable:
+        refs = [s["ground_truth"] for s in scorable]
+        hyps = [s["ocr_text"] for s in scorable]
+        word_rates = _per_sample_error_rates(jiwer.process_words(refs, hyps))
+        char_rates = _per_sample_error_rates(jiwer.process_characters(refs, hyps))
+        for sample, img_wer, img_cer in zip(scorable, word_rates, char_rates):
+            wers[sample["image"]] = img_wer
+            cers[sample["image"]] = img_cer
+
+    results = []
+    for sample in samples:
+        ground_truth = sample["ground_truth"]
+        ocr_text = sample["ocr_text"]
+        results.append({
+            "image": sample["image"],
+            "ground_truth": ground_truth[:50] + "..." if len(ground_truth) > 50 else ground_truth,
+            "ocr_output": ocr_text[:50] + "..." if len(ocr_text) > 50 else ocr_text,
+            "wer": round(wers.get(sample["image"], 1.0), 4),
+            "cer": round(cers.get(sample["image"], 1.0), 4),
+            "confidence": round(sample["confidence"], 4),
+            "is_image_only": sample["is_image_only"],
+            "exact_match": ground_truth == ocr_text,
+        })
+    return results
+
 def main():
+    parser = argparse.ArgumentParser(description="Run the Vision OCR benchmark")
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Ignore cached OCR output and always invoke the helper (use for gate checks)",
+    )
+    parser.add_argument(
+        "--asyncio",
+        action="store_true",
+        help="Drive the OCR helpers with asyncio subprocesses instead of a thread pool",
+    )
+    args = parser.parse_args()
+
     # Paths
     script_dir = Path(__file__).parent
     images_dir = script_dir / "images"
     gt_dir = script_dir / "ground-truth"
     results_file = script_dir / "benchmark_results.json"
+    cache_file = script_dir / ".ocr_cache.json"
 
     # Find Vision OCR helper
     vision_ocr_candidates = [
@@ -59,81 +250,84 @@ def main():
     print(f"Ground truth directory: {gt_dir}")
     print()
 
-    # Collect results
-    results = []
-    total_wer = 0.0
-    total_cer = 0.0
-    processed = 0
+    # Cached OCR output from previous runs (skipped entirely with --no-cache)
+    cache = None
+    if not args.no_cache:
+        cache = {}
+        if cache_file.exists():
+            try:
+                cache = json.loads(cache_file.read_text())
+            except ValueError:
+                print(f"  WARNING: Ignoring unreadable OCR cache {cache_file}")
+
+    # Collect OCR output
+    samples = []
 
     image_files = sorted(images_dir.glob("*.png"))
     print(f"Processing {len(image_files)} images...\n")
 
-    for image_path in image_files:
-        gt_path = gt_dir / (image_path.stem + ".txt")
-
-        if not gt_path.exists():
-            print(f"  SKIP: No ground truth for {image_path.name}")
-            continue
-
-        # Read ground truth
-        ground_truth = gt_path.read_text().strip()
+    if args.asyncio:
+        gathered = asyncio.run(collect_samples_async(image_files, gt_dir, vision_ocr_path, cache))
+        for image_path, sample in zip(image_files, gathered):
+            if sample is None:
+                print(f"  SKIP: No ground truth for {image_path.name}")
+                continue
+            samples.append(sample)
+    else:
+        # vision_ocr runs out-of-process, so threads overlap the helper calls
+        # without contending on the GIL.
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+            futures = {
+                executor.submit(process_one, image_path, gt_dir, vision_ocr_path, cache): image_path
+                for image_path in image_files
+            }
+            for future in as_completed(futures):
+                sample = future.result()
+                if sample is None:
+                    print(f"  SKIP: No ground truth for {futures[future].name}")
+                    continue
+                samples.append(sample)
 
-        # Run OCR
-        ocr_text, confidence = run_ocr(str(image_path), vision_ocr_path)
-        ocr_text = ocr_text.strip()
+    if cache is not None:
+        cache_file.write_text(json.dumps(cache))
 
-        # Calculate WER and CER
-        if ground_truth and ocr_text:
-            img_wer = wer(ground_truth, ocr_text)
-            img_cer = cer(ground_truth, ocr_text)
-        else:
-            img_wer = 1.0  # 100% error if empty
-            img_cer = 1.0
-
-        # Determine image type from filename
-        is_image_only = any(
-            image_path.name.startswith(prefix) and int(image_path.stem.split("_")[1]) <= threshold
-            for prefix, threshold in [
-                ("error_", 8),
-                ("instruction_", 3),
-                ("technical_", 3),
-                ("network_", 2),
-                ("multiline_", 4),
-            ]
-        )
+    # Keep the saved report deterministic regardless of completion order
+    samples.sort(key=lambda s: s["image"])
 
-        result = {
-            "image": image_path.name,
-            "ground_truth": ground_truth[:50] + "..." if len(ground_truth) > 50 else ground_truth,
-            "ocr_output": ocr_text[:50] + "..." if len(ocr_text) > 50 else ocr_text,
-            "wer": round(img_wer, 4),
-            "cer": round(img_cer, 4),
-            "confidence": round(confidence, 4),
-            "is_image_only": is_image_only,
-            "exact_match": ground_truth == ocr_text,
-        }
-        results.append(result)
+    # Calculate WER and CER
+    results = score_samples(samples)
+    total_wer = 0.0
+    total_cer = 0.0
+    processed = 0
+    exact_matches = 0
+    # Image-only vs text statistics, accumulated in the same pass
+    image_only_count = 0
+    image_only_wer_sum = 0.0
+    text_wer_sum = 0.0
 
-        total_wer += img_wer
-        total_cer += img_cer
+    for result in results:
+        total_wer += result["wer"]
+        total_cer += result["cer"]
         processed += 1
+        exact_matches += result["exact_match"]
+        if result["is_image_only"]:
+            image_only_count += 1
+            image_only_wer_sum += result["wer"]
+        else:
+            text_wer_sum += result["wer"]
 
         # Progress indicator
-        status = "EXACT" if result["exact_match"] else f"WER={img_wer:.2%}"
-        type_indicator = "[IMG]" if is_image_only else "[TXT]"
-        print(f"  {type_indicator} {image_path.name}: {status}")
+        status = "EXACT" if result["exact_match"] else f"WER={result['wer']:.2%}"
+        type_indicator = "[IMG]" if result["is_image_only"] else "[TXT]"
+        print(f"  {type_indicator} {result['image']}: {status}")
 
     # Calculate summary statistics
     avg_wer = total_wer / max(processed, 1)
     avg_cer = total_cer / max(processed, 1)
-    exact_matches = sum(1 for r in results if r["exact_match"])
-
-    # Image-only vs text statistics
-    image_only_results = [r for r in results if r["is_image_only"]]
-    text_results = [r for r in results if not r["is_image_only"]]
+    text_count = processed - image_only_count
 
-    image_only_wer = sum(r["wer"] for r in image_only_results) / max(len(image_only_results), 1)
-    text_wer = sum(r["wer"] for r in text_results) / max(len(text_results), 1)
+    image_only_wer = image_only_wer_sum / max(image_only_count, 1)
+    text_wer = text_wer_sum / max(text_count, 1)
 
     summary = {
         "total_images": processed,
@@ -141,9 +335,9 @@ def main():
         "exact_match_rate": round(exact_matches / max(processed, 1), 4),
         "average_wer": round(avg_wer, 4),
         "average_cer": round(avg_cer, 4),
-        "image_only_count": len(image_only_results),
+        "image_only_count": image_only_count,
         "image_only_wer": round(image_only_wer, 4),
-        "text_based_count": len(text_results),
+        "text_based_count": text_count,
         "text_based_wer": round(text_wer, 4),
     }
 
@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+"""ASGI entrypoint for production Search API serving (e.g. under uvicorn)."""
+
+from runtime_config import (
+    claim_backend_check,
+    ensure_valid_runtime_config,
+    load_runtime_config,
+)
+
+config = load_runtime_config()
+# Only one worker per server pings the rate-limit backend on cold start
+ensure_valid_runtime_config(config, check_backends=claim_backend_check())
+
+from asgiref.wsgi import WsgiToAsgi  # noqa: E402
+
+from search_api import app as wsgi_app, _get_engine  # noqa: E402
+
+# Load models and open DB sessions before this worker accepts traffic
+_get_engine()
+
+# Flask handlers stay synchronous; asgiref runs them on its thread pool
+# while uvicorn's event loop owns the client connections.
+app = WsgiToAsgi(wsgi_app)
+
+__all__ = ["app"]
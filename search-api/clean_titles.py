@@ -7,18 +7,52 @@ Preserves original title in heading_path if not already set.
 """
 
 import re
+from rapidfuzz import fuzz
 from db_config import connect_db
 
+BREADCRUMB_SEP = " > "
+# Adjacent segments at least this similar (case-insensitive Indel ratio, 0-100)
+# are treated as duplicates, e.g. "Access Policy" vs "Access Policy."
+DEDUP_SIMILARITY = 92
+_RE_LEADING_STARS = re.compile(r"^\*+\s*")
+
+# Rewrites plain two-segment breadcrumbs ("Doc > Section" → "Doc: Section")
+# in the database, matching clean_title() exactly for that case. Titles with
+# markdown, empty or possibly near-duplicate segments, or that would need
+# truncation are left for the Python pass.
+SIMPLE_BREADCRUMB_SQL = """
+    UPDATE kb_articles AS k
+    SET title = s.head || ': ' || s.tail,
+        heading_path = COALESCE(NULLIF(k.heading_path, ''), k.title)
+    FROM (
+        SELECT id,
+               btrim(split_part(title, ' > ', 1), E' \\t\\r\\n') AS head,
+               btrim(split_part(title, ' > ', 2), E' \\t\\r\\n') AS tail
+        FROM kb_articles
+        WHERE is_active = true AND title LIKE '% > %'
+          AND source_document_id != 'curated_kb'
+          AND position('*' in title) = 0
+          AND array_length(string_to_array(title, ' > '), 1) = 2
+    ) AS s
+    WHERE k.id = s.id
+      AND s.head <> '' AND s.tail <> ''
+      -- Indel distance >= length difference, so this guarantees the segments
+      -- are less than DEDUP_SIMILARITY alike; closer pairs go to Python
+      AND abs(length(s.head) - length(s.tail)) * 100
+          > (100 - {dedup_similarity}) * (length(s.head) + length(s.tail))
+      AND length(s.head) + length(s.tail) + 2 <= 150
+""".format(dedup_similarity=DEDUP_SIMILARITY)
+
 
 def clean_title(title: str, heading_path: str) -> tuple:
     """
     Clean a breadcrumb title into a concise, searchable title.
     Returns (new_title, new_heading_path).
     """
-    if " > " not in title:
+    if BREADCRUMB_SEP not in title:
         return title, heading_path
 
-    segments = [s.strip() for s in title.split(" > ")]
+    segments = [s.strip() for s in title.split(BREADCRUMB_SEP)]
     segments = [s for s in segments if s]  # remove empties
 
     if not segments:
@@ -30,19 +64,19 @@ def clean_title(title: str, heading_path: str) -> tuple:
     else:
         new_heading_path = heading_path
 
-    # Remove duplicate adjacent segments (e.g., "OKTA - Runbook > OKTA - Runbook > ...")
+    # Remove duplicate and near-duplicate adjacent segments
+    # (e.g., "OKTA - Runbook > OKTA - Runbook > ...")
     deduped = [segments[0]]
     for seg in segments[1:]:
-        if seg.lower() != deduped[-1].lower():
+        if fuzz.ratio(seg, deduped[-1], processor=str.lower) < DEDUP_SIMILARITY:
             deduped.append(seg)
     segments = deduped
 
     # Clean markdown artifacts from segments
     cleaned = []
     for seg in segments:
-        seg = re.sub(r"\*\*", "", seg)  # Remove bold markers
-        seg = re.sub(r"^\*+\s*", "", seg)  # Remove leading asterisks
-        seg = seg.strip()
+        # Remove bold markers, then leading asterisks
+        seg = _RE_LEADING_STARS.sub("", seg.replace("**", "")).strip()
         if seg:
             cleaned.append(seg)
     segments = cleaned
@@ -80,35 +114,62 @@ def clean_title(title: str, heading_path: str) -> tuple:
 
 
 def main():
+    from psycopg2.extras import execute_values
+
     conn = connect_db()
-    conn.autocommit = True
     cur = conn.cursor()
 
-    # Fetch all active articles with breadcrumb titles
-    cur.execute("""
-        SELECT id, title, heading_path
-        FROM kb_articles
-        WHERE is_active = true AND title LIKE '%>%'
-        AND source_document_id != 'curated_kb'
-    """)
-    rows = cur.fetchall()
-    print(f"Found {len(rows)} articles with breadcrumb titles\n")
-
-    updated = 0
-    samples = []
-
-    for article_id, old_title, heading_path in rows:
-        new_title, new_heading_path = clean_title(old_title, heading_path)
-
-        if new_title != old_title:
-            cur.execute(
-                "UPDATE kb_articles SET title = %s, heading_path = %s WHERE id = %s",
-                (new_title, new_heading_path, article_id),
+    # One transaction for the whole cleanup: committed on success, rolled
+    # back if any step fails
+    with conn:
+        # Handle the common two-segment case entirely in SQL
+        cur.execute(SIMPLE_BREADCRUMB_SQL)
+        simple_updated = cur.rowcount
+        print(f"Rewrote {simple_updated} two-segment breadcrumb titles in SQL\n")
+
+        # Stream the remaining breadcrumb titles through a server-side cursor
+        # so memory stays flat regardless of table size
+        read_cur = conn.cursor(name="clean_titles_cur")
+        read_cur.itersize = 2000
+        read_cur.execute("""
+            SELECT id, title, heading_path
+            FROM kb_articles
+            WHERE is_active = true AND title LIKE '% > %'
+            AND source_document_id != 'curated_kb'
+        """)
+
+        found = 0
+        updates = []
+        samples = []
+
+        for article_id, old_title, heading_path in read_cur:
+            found += 1
+            new_title, new_heading_path = clean_title(old_title, heading_path)
+
+            if new_title != old_title:
+                updates.append((article_id, new_title, new_heading_path))
+
+                if len(samples) < 15:
+                    samples.append((old_title[:80], new_title[:80]))
+
+        read_cur.close()
+        print(f"Found {found} articles with breadcrumb titles\n")
+
+        # Apply all changed titles in one batched UPDATE ... FROM (VALUES ...)
+        if updates:
+            execute_values(
+                cur,
+                """
+                UPDATE kb_articles AS k
+                SET title = v.title, heading_path = v.heading_path
+                FROM (VALUES %s) AS v(id, title, heading_path)
+                WHERE k.id = v.id
+                """,
+                updates,
+                template="(%s::uuid, %s, %s)",
+                page_size=1000,
             )
-            updated += 1
-
-            if len(samples) < 15:
-                samples.append((old_title[:80], new_title[:80]))
+    updated = simple_updated + len(updates)
 
     print(f"Updated {updated} titles\n")
     print("Sample transformations:")
@@ -8,9 +8,15 @@ Connection values come from environment variables:
 - ASSISTSUPPORT_DB_USER (default: assistsupport_dev)
 - ASSISTSUPPORT_DB_PASSWORD (default: empty)
 - ASSISTSUPPORT_DB_NAME (default: assistsupport_dev)
+- ASSISTSUPPORT_DB_POOL (default: 8) — max connections in the shared pool
 """
 
 import os
+import threading
+from contextlib import contextmanager
+
+_POOL = None
+_POOL_LOCK = threading.Lock()
 
 
 def get_db_conn_kwargs():
@@ -35,3 +41,56 @@ def connect_db():
     import psycopg2
 
     return psycopg2.connect(**get_db_conn_kwargs())
+
+
+def configured_pool_size():
+    """Max pool connections from ASSISTSUPPORT_DB_POOL."""
+    return int(os.environ.get("ASSISTSUPPORT_DB_POOL", "8"))
+
+
+def get_pool(minconn=1, maxconn=None):
+    """
+    Return the process-wide ThreadedConnectionPool, creating it on first use.
+    maxconn only applies to that first call; getconn() raises PoolError
+    rather than blocking once every connection is checked out.
+    """
+    global _POOL
+    if _POOL is None:
+        with _POOL_LOCK:
+            if _POOL is None:
+                from psycopg2.pool import ThreadedConnectionPool
+
+                if maxconn is None:
+                    maxconn = configured_pool_size()
+                _POOL = ThreadedConnectionPool(
+                    minconn,
+                    maxconn,
+                    keepalives=1,
+                    keepalives_idle=60,
+                    **get_db_conn_kwargs(),
+                )
+    return _POOL
+
+
+def get_db_conn():
+    """Check out a pooled connection; return it with put_db_conn()."""
+    return get_pool().getconn()
+
+
+def put_db_conn(conn, close=False):
+    """Return a connection to the pool (close=True discards a broken one)."""
+    get_pool().putconn(conn, close=close)
+
+
+@contextmanager
+def db_conn():
+    """Borrow a pooled connection for the duration of a with-block."""
+    conn = get_db_conn()
+    try:
+        yield conn
+    except Exception:
+        if not conn.closed:
+            conn.rollback()
+        raise
+    finally:
+        put_db_conn(conn, close=bool(conn.closed))
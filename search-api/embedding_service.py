@@ -5,57 +5,164 @@ Generates 768-dimensional embeddings using intfloat/e5-base-v2 (IR-optimized)
 Fallback: sentence-transformers/all-MiniLM-L6-v2 (384 dims)
 """
 
+import functools
+import hashlib
 import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
 import numpy as np
 from sentence_transformers import SentenceTransformer
 
+DEFAULT_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+MODEL_DIR = os.path.expanduser("~/assistsupport-semantic-migration/models")
+
+
+@functools.lru_cache(maxsize=4)
+def _load_model(model_name: str, cache_folder: str) -> SentenceTransformer:
+    """Load a SentenceTransformer once per process and share it across instances"""
+    return SentenceTransformer(model_name, cache_folder=cache_folder)
+
 
 class EmbeddingService:
     # Models that require "query: "/"passage: " prefixes
     PREFIX_MODELS = {"intfloat/e5-base-v2", "intfloat/e5-small-v2", "intfloat/e5-large-v2"}
+    # Max cached embeddings per service (~15 MB at 384 dims, ~30 MB at 768)
+    CACHE_SIZE = 10_000
 
-    def __init__(self, model_name="sentence-transformers/all-MiniLM-L6-v2"):
+    def __init__(self, model_name=DEFAULT_MODEL):
         """Initialize embedding service with local model"""
-        model_dir = os.path.expanduser("~/assistsupport-semantic-migration/models")
-        self.model = SentenceTransformer(model_name, cache_folder=model_dir)
+        self.model = _load_model(model_name, MODEL_DIR)
         self.model_name = model_name
         self.dimension = self.model.get_sentence_embedding_dimension()
         self.uses_prefix = model_name in self.PREFIX_MODELS
+        self._encode = self.model.encode
+        # Validate the output shape once here so the embed_* hot paths don't have to
+        probe = self._encode("__probe__", normalize_embeddings=True)
+        if probe.shape != (self.dimension,):
+            raise ValueError(
+                f"Model {model_name} produced shape {probe.shape}, expected ({self.dimension},)"
+            )
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
         print(f"Embedding service initialized: {model_name}")
         print(f"  Dimension: {self.dimension}")
         print(f"  Device: {self.model.device}")
         print(f"  Uses prefix: {self.uses_prefix}")
 
+    @staticmethod
+    def pool_initializer(model_name=DEFAULT_MODEL):
+        """
+        Warm the model in a worker process before any task runs.
+        Usage: ProcessPoolExecutor(initializer=EmbeddingService.pool_initializer,
+                                   initargs=(model_name,))
+        """
+        _load_model(model_name, MODEL_DIR)
+
+    def _cache_key(self, text: str, is_query: bool) -> bytes:
+        role = "Q" if is_query else "P"
+        return hashlib.sha256(f"{self.model_name}\0{role}\0{text}".encode()).digest()
+
+    def _cache_get(self, key: bytes):
+        with self._cache_lock:
+            embedding = self._cache.get(key)
+            if embedding is not None:
+                self._cache.move_to_end(key)
+            return embedding
+
+    def _cache_put(self, key: bytes, embedding: np.ndarray):
+        embedding.flags.writeable = False  # shared between callers
+        with self._cache_lock:
+            self._cache[key] = embedding
+            if len(self._cache) > self.CACHE_SIZE:
+                self._cache.popitem(last=False)
+
     def embed_query(self, text: str) -> np.ndarray:
         """Generate embedding for a search query"""
         if not text or not isinstance(text, str):
             raise ValueError("Text must be non-empty string")
+        key = self._cache_key(text, is_query=True)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
         prefixed = f"query: {text}" if self.uses_prefix else text
-        embedding = self.model.encode(prefixed, normalize_embeddings=True)
-        return embedding.astype(np.float32)
+        embedding = self._encode(prefixed, normalize_embeddings=True).astype(np.float32)
+        self._cache_put(key, embedding)
+        return embedding
 
     def embed_text(self, text: str) -> np.ndarray:
         """Generate embedding for a document/passage"""
         if not text or not isinstance(text, str):
             raise ValueError("Text must be non-empty string")
+        key = self._cache_key(text, is_query=False)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
         prefixed = f"passage: {text}" if self.uses_prefix else text
-        embedding = self.model.encode(prefixed, normalize_embeddings=True)
-        return embedding.astype(np.float32)
+        embedding = self._encode(prefixed, normalize_embeddings=True).astype(np.float32)
+        self._cache_put(key, embedding)
+        return embedding
 
-    def embed_batch(self, texts: list, batch_size=32, show_progress=False, is_query=False) -> list:
-        """Generate embeddings for multiple texts"""
+    def embed_batch(
+        self, texts: list, batch_size=32, show_progress=False, is_query=False, as_list=False
+    ) -> np.ndarray:
+        """
+        Generate embeddings for multiple texts.
+        Returns a contiguous float32 (N, D) matrix; pass as_list=True for a list of rows.
+        """
         if not texts:
             raise ValueError("Texts must be non-empty list")
-        if self.uses_prefix:
-            prefix = "query: " if is_query else "passage: "
-            texts = [f"{prefix}{t}" for t in texts]
-        embeddings = self.model.encode(
-            texts,
-            batch_size=batch_size,
-            show_progress_bar=show_progress,
-            normalize_embeddings=True,
-        )
-        return [e.astype(np.float32) for e in embeddings]
+
+        # Serve repeated texts from the cache and only encode the misses
+        keys = [self._cache_key(t, is_query) for t in texts]
+        embeddings = np.empty((len(texts), self.dimension), dtype=np.float32)
+        misses = []
+        for i, key in enumerate(keys):
+            cached = self._cache_get(key)
+            if cached is None:
+                misses.append(i)
+            else:
+                embeddings[i] = cached
+
+        if misses:
+            miss_texts = [texts[i] for i in misses]
+            if self.uses_prefix:
+                prefix = "query: " if is_query else "passage: "
+                miss_texts = [f"{prefix}{t}" for t in miss_texts]
+            encoded = self._encode(
+                miss_texts,
+                batch_size=batch_size,
+                show_progress_bar=show_progress,
+                normalize_embeddings=True,
+                convert_to_numpy=True,
+            )
+            embeddings[misses] = encoded
+            for i in misses:
+                self._cache_put(keys[i], embeddings[i].copy())
+
+        if as_list:
+            return list(embeddings)
+        return embeddings
+
+    def embed_batch_int8(self, texts: list, batch_size=32, is_query=False):
+        """
+        Generate int8-quantized embeddings for compact storage/transfer.
+        Each vector is scaled symmetrically by its max |x|, so x ≈ code * scale / 127.
+        Returns (codes: int8 (N, D), scales: float32 (N,)).
+        """
+        embeddings = self.embed_batch(texts, batch_size=batch_size, is_query=is_query)
+        scales = np.max(np.abs(embeddings), axis=1)
+        scales[scales == 0] = 1.0  # all-zero vectors quantize to zero codes
+        codes = np.round(embeddings / scales[:, None] * 127).astype(np.int8)
+        return codes, scales.astype(np.float32)
+
+    @staticmethod
+    def int8_similarity(q_codes, q_scales, d_codes, d_scales) -> np.ndarray:
+        """Approximate cosine similarity matrix (Q, N) between int8-quantized embeddings"""
+        dots = np.atleast_2d(q_codes).astype(np.int32) @ np.atleast_2d(d_codes).astype(np.int32).T
+        return dots * (np.atleast_1d(q_scales)[:, None] * np.atleast_1d(d_scales)[None, :] / (127 * 127))
 
     def test(self):
         """Verify service is working"""
@@ -73,14 +180,78 @@ class EmbeddingService:
         for text, embedding in zip(passages, p_embs):
             print(f"  Passage: {text:50s} -> {len(embedding):3d} dims")
 
-        sim_01 = np.dot(q_emb, p_embs[0])
-        sim_02 = np.dot(q_emb, p_embs[1])
+        # One matrix-vector product scores every passage (embeddings are normalized)
+        sim_01, sim_02 = p_embs @ q_emb
         print(f"\n  Cosine similarity (Q 'flash drive' vs P 'USB forbidden'): {sim_01:.4f}")
         print(f"  Cosine similarity (Q 'flash drive' vs P 'cloud storage'):  {sim_02:.4f}")
         print(f"  Q is more similar to P1 than P2: {sim_01 > sim_02}")
         print("Service test passed\n")
 
 
+class QueryEmbeddingBatcher:
+    """
+    Coalesce concurrent embed_query calls into one embed_batch forward pass.
+
+    Callers block in embed(); a single worker thread collects the queries that
+    arrive within max_wait_ms of the first one (up to max_batch) and encodes
+    them together. Cache hits return immediately without queueing.
+    """
+
+    def __init__(self, service: EmbeddingService, max_wait_ms: float = 5.0, max_batch: int = 32):
+        self.service = service
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="query-embed-batcher", daemon=True)
+        self._worker.start()
+
+    def embed(self, text: str) -> np.ndarray:
+        """Embed a search query, batched with any concurrent callers"""
+        if not text or not isinstance(text, str):
+            raise ValueError("Text must be non-empty string")
+        cached = self.service._cache_get(self.service._cache_key(text, is_query=True))
+        if cached is not None:
+            return cached
+        future = Future()
+        self._queue.put((text, future))
+        return future.result()
+
+    def close(self):
+        """Stop the worker thread after it drains queued queries"""
+        self._queue.put(None)
+        self._worker.join()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.max_wait
+            stop = False
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+
+            try:
+                embeddings = self.service.embed_batch([t for t, _ in batch], is_query=True)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+            else:
+                for (_, future), embedding in zip(batch, embeddings):
+                    future.set_result(embedding)
+            if stop:
+                return
+
+
 if __name__ == "__main__":
     service = EmbeddingService()
     service.test()
@@ -8,9 +8,37 @@ merges them into a single richer article and deactivates the merged-from chunks.
 from db_config import connect_db
 
 
+def ensure_schema(conn):
+    """
+    Idempotently add the columns/indexes this script's queries rely on:
+    - content_len: stored LENGTH(content), so filters don't recompute it per row
+    - kb_articles_thin_active: partial index for the Phase-1 thin-chunk scan
+    - kb_articles_title_tsv: GIN index for the Phase-2 topic match
+    """
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block.
+    conn.autocommit = True
+    cur = conn.cursor()
+    cur.execute("""
+        ALTER TABLE kb_articles
+        ADD COLUMN IF NOT EXISTS content_len INT
+        GENERATED ALWAYS AS (LENGTH(content)) STORED
+    """)
+    cur.execute("""
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS kb_articles_thin_active
+        ON kb_articles (source_document_id, chunk_index)
+        WHERE is_active AND content_len < 500
+    """)
+    cur.execute("""
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS kb_articles_title_tsv
+        ON kb_articles USING gin (to_tsvector('simple', title))
+    """)
+    cur.close()
+    conn.autocommit = False
+
+
 def main():
     conn = connect_db()
-    conn.autocommit = True
+    ensure_schema(conn)
     cur = conn.cursor()
 
     print("=" * 70)
@@ -18,99 +46,96 @@ def main():
     print("=" * 70)
     print()
 
-    # Phase 1: Find source documents with multiple thin chunks
-    cur.execute("""
-        SELECT source_document_id, COUNT(*) as chunk_count,
-               SUM(LENGTH(content)) as total_chars,
-               AVG(LENGTH(content)) as avg_chars,
-               MIN(LENGTH(content)) as min_chars
-        FROM kb_articles
-        WHERE is_active = true
-          AND source_document_id IS NOT NULL
-          AND source_document_id != 'curated_kb'
-          AND LENGTH(content) < 500
-        GROUP BY source_document_id
-        HAVING COUNT(*) >= 2
-        ORDER BY COUNT(*) DESC
-        LIMIT 50
-    """)
-    mergeable_docs = cur.fetchall()
-    print(f"Found {len(mergeable_docs)} source documents with 2+ thin chunks\n")
+    # Phase 1: Merge thin chunks of the same source document in one statement.
+    # For each of the 50 documents with the most thin chunks, the longest chunk
+    # (earliest chunk_index on ties) becomes the primary and the others are
+    # appended as "## heading" sections in chunk order, then deactivated.
+    # Each phase runs in its own transaction (committed on success, rolled
+    # back on error) instead of autocommitting every statement
+    with conn:
+        cur.execute("""
+            WITH docs AS (
+                SELECT source_document_id
+                FROM kb_articles
+                WHERE is_active = true
+                  AND source_document_id IS NOT NULL
+                  AND source_document_id != 'curated_kb'
+                  AND content_len < 500
+                GROUP BY source_document_id
+                HAVING COUNT(*) >= 2
+                ORDER BY COUNT(*) DESC
+                LIMIT 50
+            ),
+            thin AS (
+                SELECT k.id, k.title, k.content, k.content_len, k.category, k.chunk_index,
+                       k.heading_path, k.source_document_id,
+                       ROW_NUMBER() OVER (
+                           PARTITION BY k.source_document_id
+                           ORDER BY k.content_len DESC, k.chunk_index ASC
+                       ) AS rn
+                FROM kb_articles k
+                JOIN docs USING (source_document_id)
+                WHERE k.is_active = true AND k.content_len < 500
+            ),
+            merged AS (
+                SELECT p.id AS primary_id, p.title, p.category,
+                       p.content_len AS primary_len,
+                       btrim(
+                           p.content || string_agg(
+                               E'\n\n\n## ' || COALESCE(NULLIF(o.heading_path, ''), o.title)
+                                   || E'\n\n' || o.content,
+                               '' ORDER BY o.chunk_index
+                           ),
+                           E' \t\r\n'
+                       ) AS merged_content,
+                       array_agg(o.id) AS merged_from_ids
+                FROM thin p
+                JOIN thin o ON o.source_document_id = p.source_document_id AND o.rn > 1
+                WHERE p.rn = 1
+                GROUP BY p.id, p.title, p.category, p.content, p.content_len
+            ),
+            -- Only merge if it meaningfully increases content
+            to_merge AS (
+                SELECT * FROM merged WHERE LENGTH(merged_content) > primary_len + 50
+            ),
+            updated AS (
+                UPDATE kb_articles k
+                SET content = m.merged_content
+                FROM to_merge m
+                WHERE k.id = m.primary_id
+                RETURNING k.id
+            ),
+            deactivated AS (
+                UPDATE kb_articles k
+                SET is_active = false
+                FROM to_merge m
+                WHERE k.id = ANY(m.merged_from_ids)
+                RETURNING k.id
+            )
+            SELECT d.doc_count, m.title, m.category, m.primary_len,
+                   LENGTH(m.merged_content), cardinality(m.merged_from_ids)
+            FROM (SELECT COUNT(*) AS doc_count FROM docs) d
+            LEFT JOIN to_merge m ON true
+            ORDER BY cardinality(m.merged_from_ids) DESC, m.title
+        """)
+        merge_rows = cur.fetchall()
+    print(f"Found {merge_rows[0][0]} source documents with 2+ thin chunks\n")
 
     merged_count = 0
     deactivated_count = 0
     expanded_count = 0
 
-    for doc_id, chunk_count, total_chars, avg_chars, min_chars in mergeable_docs:
-        # Get all thin chunks for this source document, ordered by chunk_index
-        cur.execute("""
-            SELECT id, title, content, category, chunk_index, heading_path
-            FROM kb_articles
-            WHERE source_document_id = %s AND is_active = true AND LENGTH(content) < 500
-            ORDER BY chunk_index ASC
-        """, (doc_id,))
-        chunks = cur.fetchall()
-
-        if len(chunks) < 2:
-            continue
-
-        # Pick the best chunk as the primary (longest content)
-        best_idx = 0
-        best_len = 0
-        for i, chunk in enumerate(chunks):
-            content_len = len(chunk[2])
-            if content_len > best_len:
-                best_len = content_len
-                best_idx = i
-
-        primary = chunks[best_idx]
-        primary_id = primary[0]
-        primary_title = primary[1]
-        primary_content = primary[2]
-        primary_category = primary[3]
-
-        # Merge content from other chunks
-        merged_sections = [primary_content]
-        merged_from_ids = []
-
-        for i, chunk in enumerate(chunks):
-            if i == best_idx:
-                continue
-            chunk_id = chunk[0]
-            chunk_heading = chunk[4] or chunk[1]  # Use heading_path or title
-            chunk_content = chunk[2]
-
-            # Add section with heading
-            section = f"\n\n## {chunk_heading}\n\n{chunk_content}"
-            merged_sections.append(section)
-            merged_from_ids.append(chunk_id)
-
-        merged_content = "\n".join(merged_sections).strip()
-
-        # Only merge if it meaningfully increases content
-        if len(merged_content) <= len(primary_content) + 50:
+    for _, primary_title, primary_category, primary_len, merged_len, merged_from in merge_rows:
+        if primary_title is None:  # no document met the merge threshold
             continue
 
-        # Update primary article with merged content
-        cur.execute(
-            "UPDATE kb_articles SET content = %s WHERE id = %s",
-            (merged_content, primary_id),
-        )
-
-        # Deactivate merged-from chunks
-        for chunk_id in merged_from_ids:
-            cur.execute(
-                "UPDATE kb_articles SET is_active = false WHERE id = %s",
-                (chunk_id,),
-            )
-            deactivated_count += 1
-
         merged_count += 1
-        expanded_count += len(merged_from_ids)
+        expanded_count += merged_from
+        deactivated_count += merged_from
 
         if merged_count <= 10:
-            print(f"  Merged {len(merged_from_ids)+1} chunks → [{primary_category}] {primary_title[:60]}")
-            print(f"    Before: {len(primary_content)} chars → After: {len(merged_content)} chars")
+            print(f"  Merged {merged_from+1} chunks → [{primary_category}] {primary_title[:60]}")
+            print(f"    Before: {primary_len} chars → After: {merged_len} chars")
 
     print(f"\n  Total documents merged: {merged_count}")
     print(f"  Chunks merged into primaries: {expanded_count}")
@@ -131,22 +156,10 @@ def main():
         "wifi", "google",
     ]
 
-    topic_pattern = "|".join(popular_topics)
-
-    cur.execute(f"""
-        SELECT id, title, content, category, LENGTH(content) as len
-        FROM kb_articles
-        WHERE is_active = true
-          AND source_document_id != 'curated_kb'
-          AND LENGTH(content) BETWEEN 100 AND 300
-          AND (
-            {" OR ".join(["LOWER(title) LIKE %s" for _ in popular_topics])}
-          )
-        ORDER BY LENGTH(content) ASC
-        LIMIT 40
-    """, [f"%{t}%" for t in popular_topics])
-    thin_popular = cur.fetchall()
-    print(f"Found {len(thin_popular)} thin articles on popular topics (100-300 chars)\n")
+    # Match topics through the GIN-indexed title tsvector (kb_articles_title_tsv)
+    # instead of 20 LOWER(title) LIKE scans; ":*" keeps prefix matches like
+    # "passwords".
+    topic_query = " | ".join(f"{t}:*" for t in popular_topics)
 
     # Category-specific context additions
     category_context = {
@@ -155,17 +168,35 @@ def main():
         "REFERENCE": "\n\n---\n*This is a reference document. For step-by-step instructions, search for the related procedure guide. Contact IT Support if you need further clarification.*",
     }
 
-    enriched = 0
-    for article_id, title, content, category, length in thin_popular:
-        context = category_context.get(category, "")
-        if context and context not in content:
-            new_content = content + context
-            cur.execute(
-                "UPDATE kb_articles SET content = %s WHERE id = %s",
-                (new_content, article_id),
+    # Select the thin popular articles and append their category context in
+    # one statement; the suffix depends only on category.
+    context_values = ", ".join(["(%s, %s)"] * len(category_context))
+    context_params = [v for item in category_context.items() for v in item]
+    with conn:
+        cur.execute(f"""
+            WITH thin_popular AS (
+                SELECT id
+                FROM kb_articles
+                WHERE is_active = true
+                  AND source_document_id != 'curated_kb'
+                  AND content_len BETWEEN 100 AND 300
+                  AND to_tsvector('simple', title) @@ to_tsquery('simple', %s)
+                ORDER BY content_len ASC
+                LIMIT 40
+            ),
+            enriched AS (
+                UPDATE kb_articles AS k
+                SET content = k.content || c.suffix
+                FROM thin_popular tp, (VALUES {context_values}) AS c(category, suffix)
+                WHERE k.id = tp.id
+                  AND k.category = c.category
+                  AND position(c.suffix in k.content) = 0
+                RETURNING k.id
             )
-            enriched += 1
-
+            SELECT (SELECT COUNT(*) FROM thin_popular), (SELECT COUNT(*) FROM enriched)
+        """, [topic_query] + context_params)
+        found, enriched = cur.fetchone()
+    print(f"Found {found} thin articles on popular topics (100-300 chars)\n")
     print(f"  Enriched {enriched} thin articles with category context\n")
 
     # Final stats
@@ -176,10 +207,10 @@ def main():
         SELECT
             COUNT(*) as total,
             COUNT(CASE WHEN is_active THEN 1 END) as active,
-            ROUND(AVG(CASE WHEN is_active THEN LENGTH(content) END)) as avg_len,
-            COUNT(CASE WHEN is_active AND LENGTH(content) < 100 THEN 1 END) as under_100,
-            COUNT(CASE WHEN is_active AND LENGTH(content) < 500 THEN 1 END) as under_500,
-            COUNT(CASE WHEN is_active AND LENGTH(content) >= 500 THEN 1 END) as over_500
+            ROUND(AVG(CASE WHEN is_active THEN content_len END)) as avg_len,
+            COUNT(CASE WHEN is_active AND content_len < 100 THEN 1 END) as under_100,
+            COUNT(CASE WHEN is_active AND content_len < 500 THEN 1 END) as under_500,
+            COUNT(CASE WHEN is_active AND content_len >= 500 THEN 1 END) as over_500
         FROM kb_articles
     """)
     row = cur.fetchone()
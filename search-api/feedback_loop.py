@@ -10,6 +10,10 @@ Score formula:
     weight = min(0.3, total_count * 0.02)  # caps at 0.3 boost/penalty
 
 Minimum 3 feedback entries required before adjusting an article's score.
+
+install_quality_trigger() keeps scores current as feedback arrives, so the
+search path reads kb_articles.quality_score directly; compute_quality_scores()
+recomputes every article (backfill, or after changing the formula).
 """
 
 from db_config import connect_db
@@ -25,77 +29,114 @@ RATING_VALUES = {
     "incorrect": -0.5,
 }
 
+# AFTER INSERT trigger recomputing the rated article's score with the same
+# formula as compute_quality_scores()
+QUALITY_TRIGGER_SQL = """
+    CREATE INDEX IF NOT EXISTS search_feedback_article_id_idx
+    ON search_feedback (article_id);
+
+    CREATE OR REPLACE FUNCTION refresh_article_quality_score() RETURNS trigger AS $$
+    BEGIN
+        UPDATE kb_articles a
+        SET quality_score = GREATEST(0.5, LEAST(1.5,
+            1.0 + (GREATEST(0.0, agg.score_sum / agg.total) - 0.5)
+                * LEAST({max_weight}, agg.total * {weight_per_feedback})
+        ))
+        FROM (
+            SELECT COUNT(*) AS total,
+                   SUM(CASE rating
+                           WHEN 'helpful' THEN {helpful}
+                           WHEN 'not_helpful' THEN {not_helpful}
+                           WHEN 'incorrect' THEN {incorrect}
+                           ELSE 0
+                       END) AS score_sum
+            FROM search_feedback
+            WHERE article_id = NEW.article_id
+            HAVING COUNT(*) >= {min_feedback}
+        ) agg
+        WHERE a.id = NEW.article_id;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    DROP TRIGGER IF EXISTS search_feedback_quality_score ON search_feedback;
+    CREATE TRIGGER search_feedback_quality_score
+    AFTER INSERT ON search_feedback
+    FOR EACH ROW WHEN (NEW.article_id IS NOT NULL)
+    EXECUTE FUNCTION refresh_article_quality_score();
+""".format(
+    max_weight=MAX_WEIGHT,
+    weight_per_feedback=WEIGHT_PER_FEEDBACK,
+    helpful=RATING_VALUES["helpful"],
+    not_helpful=RATING_VALUES["not_helpful"],
+    incorrect=RATING_VALUES["incorrect"],
+    min_feedback=MIN_FEEDBACK,
+)
+
+
+def install_quality_trigger(conn):
+    """Create (or replace) the trigger that maintains quality_score on feedback insert."""
+    cur = conn.cursor()
+    cur.execute(QUALITY_TRIGGER_SQL)
+    conn.commit()
+    cur.close()
+
 
 def compute_quality_scores(conn):
     """Compute and update quality_score for all articles with sufficient feedback."""
     cur = conn.cursor()
 
-    # Aggregate feedback per article
-    cur.execute("""
-        SELECT sf.article_id, sf.rating, COUNT(*) as cnt
-        FROM search_feedback sf
-        WHERE sf.article_id IS NOT NULL
-        GROUP BY sf.article_id, sf.rating
-    """)
-
-    article_feedback = {}
-    for article_id, rating, count in cur.fetchall():
-        aid = str(article_id)
-        if aid not in article_feedback:
-            article_feedback[aid] = {"helpful": 0, "not_helpful": 0, "incorrect": 0, "total": 0}
-        article_feedback[aid][rating] = count
-        article_feedback[aid]["total"] += count
-
-    updated = 0
-    for article_id, stats in article_feedback.items():
-        total = stats["total"]
-        if total < MIN_FEEDBACK:
-            continue
-
-        # Weighted score: helpful=1.0, not_helpful=0.0, incorrect=-0.5
-        score_sum = (
-            stats["helpful"] * RATING_VALUES["helpful"]
-            + stats["not_helpful"] * RATING_VALUES["not_helpful"]
-            + stats["incorrect"] * RATING_VALUES["incorrect"]
-        )
-        helpful_ratio = max(0.0, score_sum / total)
-
-        # Weight increases with more feedback, capped at MAX_WEIGHT
-        weight = min(MAX_WEIGHT, total * WEIGHT_PER_FEEDBACK)
-
-        quality_score = 1.0 + (helpful_ratio - 0.5) * weight
-        quality_score = max(0.5, min(1.5, quality_score))  # Clamp to [0.5, 1.5]
-
-        cur.execute(
-            "UPDATE kb_articles SET quality_score = %s WHERE id = %s",
-            (quality_score, article_id),
+    # Aggregate, score and write back in one statement so no per-article rows
+    # travel to Python. Weighted score: helpful=1.0, not_helpful=0.0,
+    # incorrect=-0.5; weight grows with feedback count, capped at MAX_WEIGHT;
+    # the result is clamped to [0.5, 1.5].
+    cur.execute(
+        """
+        WITH agg AS (
+            SELECT article_id,
+                   COUNT(*) AS total,
+                   SUM(CASE rating
+                           WHEN 'helpful' THEN %(helpful)s
+                           WHEN 'not_helpful' THEN %(not_helpful)s
+                           WHEN 'incorrect' THEN %(incorrect)s
+                           ELSE 0
+                       END) AS score_sum
+            FROM search_feedback
+            WHERE article_id IS NOT NULL
+            GROUP BY article_id
+            HAVING COUNT(*) >= %(min_feedback)s
         )
-        updated += 1
+        UPDATE kb_articles a
+        SET quality_score = GREATEST(0.5, LEAST(1.5,
+            1.0 + (GREATEST(0.0, agg.score_sum / agg.total) - 0.5)
+                * LEAST(%(max_weight)s, agg.total * %(weight_per_feedback)s)
+        ))
+        FROM agg
+        WHERE a.id = agg.article_id
+        """,
+        {
+            "helpful": RATING_VALUES["helpful"],
+            "not_helpful": RATING_VALUES["not_helpful"],
+            "incorrect": RATING_VALUES["incorrect"],
+            "min_feedback": MIN_FEEDBACK,
+            "max_weight": MAX_WEIGHT,
+            "weight_per_feedback": WEIGHT_PER_FEEDBACK,
+        },
+    )
+    updated = cur.rowcount
 
     conn.commit()
     cur.close()
     return updated
 
 
-def get_quality_scores(conn, article_ids):
-    """Fetch quality scores for a set of article IDs."""
-    if not article_ids:
-        return {}
-    cur = conn.cursor()
-    placeholders = ",".join(["%s"] * len(article_ids))
-    cur.execute(
-        f"SELECT id, quality_score FROM kb_articles WHERE id IN ({placeholders})",
-        article_ids,
-    )
-    scores = {str(row[0]): float(row[1] or 1.0) for row in cur.fetchall()}
-    cur.close()
-    return scores
-
-
 if __name__ == "__main__":
     conn = connect_db()
     conn.autocommit = True
 
+    install_quality_trigger(conn)
+    print("Installed search_feedback quality score trigger")
+
     print("Computing quality scores from feedback...")
     updated = compute_quality_scores(conn)
     print(f"Updated {updated} article quality scores")
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Gunicorn configuration for production Search API serving.
+
+    gunicorn -c gunicorn_conf.py wsgi:app
+
+Defaults to gunicorn's built-in threaded worker (gthread), which needs no
+extra packages. gevent workers are opt-in through
+ASSISTSUPPORT_GUNICORN_WORKER_CLASS=gevent and need gevent and psycogreen
+installed: the gevent worker monkey-patches sockets, threads and queues, and
+psycopg2 is a C extension that needs psycogreen's wait callback to cooperate.
+
+Connection budget: every worker loads its own embedding and cross-encoder
+models and holds up to 2 * ASSISTSUPPORT_SEARCH_SESSIONS + 2 PostgreSQL
+connections (two per search session, the engine's shared one and the query
+log writer's). Keep workers * that figure well below the server's
+max_connections (100 by default) minus other clients.
+"""
+
+import os
+
+bind = f"127.0.0.1:{os.environ.get('ASSISTSUPPORT_API_PORT', '3000')}"
+
+worker_class = os.environ.get("ASSISTSUPPORT_GUNICORN_WORKER_CLASS", "gthread")
+# A small fixed count: each worker is a full copy of the models and its own
+# connection pool, so scale with memory and max_connections, not CPU count
+workers = int(os.environ.get("ASSISTSUPPORT_GUNICORN_WORKERS", "2"))
+# Request threads per gthread worker; one per search session, so requests
+# don't queue for a session inside the worker
+threads = int(os.environ.get("ASSISTSUPPORT_SEARCH_SESSIONS", "4"))
+# Concurrent greenlets per gevent worker
+worker_connections = 1000
+# wsgi.py warms the search engine at import, which opens PostgreSQL
+# connections; those must not be shared across forked workers, so the app
+# is loaded (and warmed) in each worker instead of the master
+preload_app = False
+
+
+def post_fork(server, worker):
+    """Make psycopg2 cooperative before a gevent worker opens any connections."""
+    if worker_class == "gevent":
+        from psycogreen.gevent import patch_psycopg
+
+        patch_psycopg()
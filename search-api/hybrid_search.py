@@ -6,30 +6,158 @@ Combines BM25 (keyword) + HNSW (vector) + intent detection + logging
 
 import sys
 import os
+import queue
+import threading
 import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Tuple
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-from db_config import connect_db
-from embedding_service import EmbeddingService
+from db_config import configured_pool_size, get_db_conn, get_pool, put_db_conn
+from embedding_service import EmbeddingService, QueryEmbeddingBatcher
 from score_fusion import ScoreFusion
 from intent_detection import IntentDetector
 from reranker import Reranker
-from feedback_loop import get_quality_scores
 
 
 class HybridSearchEngine:
     """Production hybrid search combining FTS + vector + intent detection"""
 
+    # Intent → DB category that receives a ranking boost
+    INTENT_CATEGORIES = {
+        "policy": "POLICY",
+        "procedure": "PROCEDURE",
+        "reference": "REFERENCE",
+    }
+    BOOSTABLE_INTENTS = frozenset(INTENT_CATEGORIES)
+    CATEGORY_BOOST = 1.20  # 20% boost for category match
+    BM25_LIMIT = 50
+    # Recent search results, reused for repeated queries until they expire or
+    # new feedback arrives
+    RESULT_CACHE_SIZE = 2048
+    RESULT_CACHE_TTL = 60.0  # seconds
+    # Article rows (everything but quality_score) reused across searches;
+    # dropped whenever kb_articles is modified, checked at most this often
+    ARTICLE_CACHE_SIZE = 4096
+    ARTICLE_CACHE_CHECK_INTERVAL = 30.0  # seconds
+
+    # BM25 and vector candidates with their current quality_score. They run
+    # concurrently on separate connections and, like the article fetch, are
+    # prepared once per connection so Postgres does not re-parse and re-plan
+    # them on every search.
+    BM25_SQL = """
+        WITH bm25 AS (
+            SELECT id, ts_rank(fts_content, query) AS score
+            FROM kb_articles, plainto_tsquery('english', $1) query
+            WHERE fts_content @@ query AND is_active = true
+            ORDER BY score DESC
+            LIMIT $2
+        )
+        SELECT a.id, a.quality_score, bm25.score
+        FROM bm25 JOIN kb_articles a ON a.id = bm25.id
+        ORDER BY bm25.score DESC
+    """
+    VECTOR_SQL = """
+        WITH vec AS (
+            SELECT id, 1 - (embedding <=> $1) AS score
+            FROM kb_articles
+            WHERE embedding IS NOT NULL AND is_active = true
+            ORDER BY embedding <=> $1
+            LIMIT $2
+        )
+        SELECT a.id, a.quality_score, vec.score
+        FROM vec JOIN kb_articles a ON a.id = vec.id
+        ORDER BY vec.score DESC
+    """
+    # VECTOR_SQL over the half-precision HNSW index (see rebuild_indexes);
+    # {dim} is the embedding column's declared dimension
+    HALFVEC_SQL = """
+        WITH vec AS (
+            SELECT id, 1 - (embedding::halfvec({dim}) <=> $1::halfvec({dim})) AS score
+            FROM kb_articles
+            WHERE embedding IS NOT NULL AND is_active = true
+            ORDER BY embedding::halfvec({dim}) <=> $1::halfvec({dim})
+            LIMIT $2
+        )
+        SELECT a.id, a.quality_score, vec.score
+        FROM vec JOIN kb_articles a ON a.id = vec.id
+        ORDER BY vec.score DESC
+    """
+    # Embedding dimension, if a valid halfvec(dim) HNSW index exists to serve HALFVEC_SQL
+    HALFVEC_DIM_SQL = """
+        SELECT a.atttypmod FROM pg_attribute a
+        WHERE a.attrelid = 'kb_articles'::regclass AND a.attname = 'embedding'
+          AND to_regtype('halfvec') IS NOT NULL
+          AND EXISTS (
+              SELECT 1 FROM pg_index i
+              WHERE i.indrelid = a.attrelid AND i.indisvalid
+                AND pg_get_indexdef(i.indexrelid)
+                    LIKE '%halfvec(' || a.atttypmod || ')) halfvec_cosine_ops%'
+          )
+    """
+    # Article rows missing from the article cache. Only the 200-char preview
+    # of content is ever returned (the reranker scores previews too), so it
+    # is cut in SQL rather than transferring whole article bodies.
+    ARTICLE_SQL = """
+        SELECT id, title,
+               CASE WHEN LENGTH(content) > 200 THEN LEFT(content, 200) || '...'
+                    ELSE COALESCE(content, '')
+               END AS content_preview,
+               category, source_document_id, chunk_index, heading_path
+        FROM kb_articles WHERE id = ANY($1)
+    """
+    # Changes whenever rows in kb_articles are inserted, updated or deleted
+    KB_VERSION_SQL = """
+        SELECT n_tup_ins + n_tup_upd + n_tup_del
+        FROM pg_stat_user_tables WHERE relname = 'kb_articles'
+    """
+
     def __init__(self):
-        self.conn = connect_db()
+        from psycopg2.extras import register_uuid
+
+        self.max_sessions = int(os.environ.get("ASSISTSUPPORT_SEARCH_SESSIONS", "4"))
+        # All connections come from db_config's pool: this shared one, two per
+        # SearchSession and the query-log writer's
+        get_pool(maxconn=max(configured_pool_size(), 2 * self.max_sessions + 2))
+
+        # Shared connection for feedback, stats and setup; searches run on
+        # pooled SearchSessions so concurrent requests don't share a cursor
+        self.conn = get_db_conn()
         self.conn.autocommit = True
+        # Article ids stay uuid.UUID objects until the response is built
+        register_uuid(conn_or_curs=self.conn)
         self.cur = self.conn.cursor()
-        # Set HNSW ef_search once at connection time
-        self.cur.execute("SET hnsw.ef_search = 100")
         self.vector_search_enabled = self._detect_vector_capability()
+        self.halfvec_dim = self._detect_halfvec_dim()
+        self._sessions = queue.LifoQueue()
+        self._session_count = 0
+        self._session_lock = threading.Lock()
+        # Vector searches run on these workers alongside BM25 instead of after it
+        self._vector_pool = ThreadPoolExecutor(
+            max_workers=self.max_sessions, thread_name_prefix="vector-search"
+        )
+        # fusion_strategy → fn(bm25_results, vector_results, intent); anything
+        # else (including "rerank") fuses adaptively
+        self._fusion_funcs = {
+            "rrf": lambda b, v, _: ScoreFusion.reciprocal_rank_fusion(b, v),
+            "weighted": lambda b, v, _: ScoreFusion.weighted_combination(b, v),
+        }
+        # Open the first session up front so setup errors surface at startup
+        self._session_count = 1
+        self._release_session(self._open_session())
         self.embedder = EmbeddingService()
+        # Concurrent searches share one forward pass for their query embeddings
+        self.query_embedder = QueryEmbeddingBatcher(self.embedder)
         self.reranker = Reranker()
+        self.query_log = QueryLogWriter()
+        self._result_cache = OrderedDict()
+        self._result_cache_lock = threading.Lock()
+        self._article_cache = OrderedDict()
+        self._article_cache_lock = threading.Lock()
+        self._article_cache_version = None
+        self._article_cache_checked = 0.0
         print("Hybrid search engine initialized")
 
     def _detect_vector_capability(self) -> bool:
@@ -45,6 +173,97 @@ class HybridSearchEngine:
             print(f"Warning: Failed to detect vector capability: {e}")
             return False
 
+    def _detect_halfvec_dim(self, cur=None, on_error=None):
+        """
+        Embedding dimension when halfvec search can use an index, else None.
+        Needs pgvector >= 0.7 and a valid halfvec HNSW expression index on
+        kb_articles (built by rebuild_indexes / upgrade_embeddings); without
+        the index the halfvec query would cast every row in a seq scan.
+        Returns on_error if the check itself fails.
+        """
+        if not self.vector_search_enabled:
+            return None
+        cur = cur or self.cur
+        try:
+            cur.execute(self.HALFVEC_DIM_SQL)
+            row = cur.fetchone()
+        except Exception as e:
+            print(f"Warning: Failed to detect halfvec support: {e}")
+            return on_error
+        return row[0] if row and row[0] > 0 else None
+
+    def _open_session(self) -> "SearchSession":
+        """Open a session's connections and PREPARE the per-search statements."""
+        from psycopg2.extras import register_uuid
+
+        conn = get_db_conn()
+        conn.autocommit = True
+        register_uuid(conn_or_curs=conn)
+        session = SearchSession(conn)
+        session.cur.execute("PREPARE search_bm25 (text, int) AS " + self.BM25_SQL)
+        session.cur.execute("PREPARE fetch_articles (uuid[]) AS " + self.ARTICLE_SQL)
+        if not self.vector_search_enabled:
+            return session
+        try:
+            from pgvector.psycopg2 import register_vector
+
+            session.vector_conn = get_db_conn()
+            session.vector_conn.autocommit = True
+            register_uuid(conn_or_curs=session.vector_conn)
+            # Adapt numpy embeddings to full-precision vector literals
+            register_vector(session.vector_conn)
+            session.vector_cur = session.vector_conn.cursor()
+            # Set HNSW ef_search once at connection time
+            session.vector_cur.execute("SET hnsw.ef_search = 100")
+            self._prepare_vector_search(session)
+        except Exception as e:
+            print(f"Warning: Failed to set up vector search; vector search disabled: {e}")
+            self.vector_search_enabled = False
+        return session
+
+    def _vector_sql(self) -> str:
+        """The vector query for the current index set (halfvec or full precision)."""
+        if self.halfvec_dim:
+            return self.HALFVEC_SQL.format(dim=self.halfvec_dim)
+        return self.VECTOR_SQL
+
+    def _prepare_vector_search(self, session: "SearchSession"):
+        """(Re-)PREPARE search_vector on the session if the vector query changed."""
+        vector_sql = self._vector_sql()
+        if session.vector_sql == vector_sql:
+            return
+        if session.vector_sql is not None:
+            session.vector_cur.execute("DEALLOCATE search_vector")
+        session.vector_cur.execute("PREPARE search_vector (vector, int) AS " + vector_sql)
+        session.vector_sql = vector_sql
+
+    def _acquire_session(self) -> "SearchSession":
+        """Take an idle session, open a new one below max_sessions, or wait"""
+        try:
+            return self._sessions.get_nowait()
+        except queue.Empty:
+            pass
+        with self._session_lock:
+            can_open = self._session_count < self.max_sessions
+            if can_open:
+                self._session_count += 1
+        if not can_open:
+            return self._sessions.get()
+        try:
+            return self._open_session()
+        except Exception:
+            with self._session_lock:
+                self._session_count -= 1
+            raise
+
+    def _release_session(self, session: "SearchSession"):
+        if session.broken:
+            session.close()
+            with self._session_lock:
+                self._session_count -= 1
+            return
+        self._sessions.put(session)
+
     def search(
         self,
         query: str,
@@ -59,55 +278,19 @@ class HybridSearchEngine:
         """
         start_total = time.time()
 
-        # Step 1: Detect intent
-        intent, intent_conf = IntentDetector.detect(query)
-
-        # Step 2: Generate query embedding
-        start_embed = time.time()
-        query_embedding = self.embedder.embed_query(query)
-        embed_time = (time.time() - start_embed) * 1000
-
-        # Step 3: Execute both searches
-        start_search = time.time()
-        bm25_results = self._bm25_search(query)
-        vector_results = self._vector_search(query_embedding, limit * 2)
-        search_time = (time.time() - start_search) * 1000
-
-        # Step 4: Fuse scores
-        start_fusion = time.time()
-        if fusion_strategy == "rrf":
-            fused = ScoreFusion.reciprocal_rank_fusion(bm25_results, vector_results)
-        elif fusion_strategy == "weighted":
-            fused = ScoreFusion.weighted_combination(bm25_results, vector_results)
-        else:  # adaptive
-            fused = ScoreFusion.adaptive_fusion(bm25_results, vector_results, intent)
-        fusion_time = (time.time() - start_fusion) * 1000
-
-        # Step 5: Category boost for intent-matching results
-        if intent in ("policy", "procedure", "reference") and intent_conf >= 0.3:
-            fused = self._apply_category_boost(fused, intent)
-
-        # Step 5.5: Apply quality score from feedback loop
-        fused = self._apply_quality_scores(fused)
-
-        # Step 6: Deduplicate
-        if use_deduplication:
-            fused = self._deduplicate_results(fused)
-
-        # Step 7: Fetch full articles
-        results = self._fetch_and_format_results(
-            fused, bm25_results, vector_results, limit
-        )
-
-        # Step 8: Cross-encoder re-ranking (optional, disabled by default)
-        rerank_time = 0
-        if fusion_strategy == "rerank":
-            rerank_pool_results = self._fetch_and_format_results(
-                fused, bm25_results, vector_results, min(limit * 2, 20)
+        cache_key = (query.strip().lower(), limit, use_deduplication, fusion_strategy)
+        cached = self._result_cache_get(cache_key)
+        cache_hit = cached is not None
+        if cache_hit:
+            intent, intent_conf, results, bm25_count, vector_count = cached
+            timings = {"embedding": 0, "search": 0, "fusion": 0, "rerank": 0}
+        else:
+            (intent, intent_conf, results, bm25_count, vector_count), timings = self._run_search(
+                query, limit, use_deduplication, fusion_strategy
+            )
+            self._result_cache_put(
+                cache_key, (intent, intent_conf, results, bm25_count, vector_count)
             )
-            start_rerank = time.time()
-            results = self.reranker.rerank(query, rerank_pool_results, top_k=limit)
-            rerank_time = (time.time() - start_rerank) * 1000
 
         # Step 9: Log query
         total_time = (time.time() - start_total) * 1000
@@ -115,8 +298,8 @@ class HybridSearchEngine:
             query,
             intent,
             intent_conf,
-            len(bm25_results),
-            len(vector_results),
+            bm25_count,
+            vector_count,
             len(results),
             total_time,
             fusion_strategy,
@@ -131,134 +314,240 @@ class HybridSearchEngine:
             "metrics": {
                 "total_results": len(results),
                 "total_time_ms": total_time,
-                "embedding_time_ms": embed_time,
-                "search_time_ms": search_time,
-                "fusion_time_ms": fusion_time,
-                "rerank_time_ms": rerank_time,
+                "embedding_time_ms": timings["embedding"],
+                "search_time_ms": timings["search"],
+                "fusion_time_ms": timings["fusion"],
+                "rerank_time_ms": timings["rerank"],
+                "cache_hit": cache_hit,
             },
         }
 
-    def _bm25_search(self, query: str) -> List[Tuple[str, float]]:
-        """Execute BM25 keyword search via FTS using plainto_tsquery"""
-        try:
-            self.cur.execute(
-                """
-                SELECT id, ts_rank(fts_content, query) as bm25_score
-                FROM kb_articles, plainto_tsquery('english', %s) query
-                WHERE fts_content @@ query AND is_active = true
-                ORDER BY bm25_score DESC
-                LIMIT 50
-                """,
-                (query,),
-            )
-            return [(str(row[0]), float(row[1])) for row in self.cur.fetchall()]
-        except Exception as e:
-            print(f"BM25 search error: {e}")
-            return []
+    def _run_search(
+        self, query: str, limit: int, use_deduplication: bool, fusion_strategy: str
+    ) -> Tuple[tuple, Dict[str, float]]:
+        """
+        Steps 1-8 of search(), everything except query logging.
 
-    def _apply_category_boost(
-        self,
-        fused_results: List[Tuple[str, float]],
-        intent: str,
-    ) -> List[Tuple[str, float]]:
-        """Boost results whose category matches the detected intent."""
-        article_ids = [r[0] for r in fused_results[:30]]  # Check top 30
-        if not article_ids:
-            return fused_results
+        Returns ((intent, intent_conf, results, bm25_count, vector_count),
+        per-stage timings in ms).
+        """
+        # Step 1: Detect intent
+        intent, intent_conf = IntentDetector.detect(query)
 
-        # Map intent to DB category
-        intent_to_category = {
-            "policy": "POLICY",
-            "procedure": "PROCEDURE",
-            "reference": "REFERENCE",
-        }
-        target_category = intent_to_category.get(intent)
-        if not target_category:
-            return fused_results
+        # Step 2: Generate query embedding
+        start_embed = time.time()
+        query_embedding = self.query_embedder.embed(query)
+        embed_time = (time.time() - start_embed) * 1000
 
-        placeholders = ",".join(["%s"] * len(article_ids))
-        self.cur.execute(
-            f"SELECT id, category FROM kb_articles WHERE id IN ({placeholders})",
-            article_ids,
+        # Step 3: Execute both searches and fetch the candidate articles
+        start_search = time.time()
+        bm25_results, vector_results, articles = self._candidate_search(
+            query, query_embedding, limit * 2
         )
-        category_map = {str(row[0]): row[1] for row in self.cur.fetchall()}
+        search_time = (time.time() - start_search) * 1000
 
-        boosted = []
-        for article_id, score in fused_results:
-            cat = category_map.get(article_id, "")
-            if cat == target_category:
-                score *= 1.20  # 20% boost for category match
-            boosted.append((article_id, score))
+        # Step 4: Fuse scores
+        start_fusion = time.time()
+        fuse = self._fusion_funcs.get(fusion_strategy, ScoreFusion.adaptive_fusion)
+        fused = fuse(bm25_results, vector_results, intent)
+        fusion_time = (time.time() - start_fusion) * 1000
 
-        return sorted(boosted, key=lambda x: x[1], reverse=True)
+        # Step 5: Category boost for intent-matching results (applied with the
+        # feedback quality score when the results are formatted)
+        boost_category = None
+        if intent in self.BOOSTABLE_INTENTS and intent_conf >= 0.3:
+            boost_category = self.INTENT_CATEGORIES[intent]
 
-    def _apply_quality_scores(
-        self, fused_results: List[Tuple[str, float]]
-    ) -> List[Tuple[str, float]]:
-        """Multiply fusion scores by per-article quality scores from feedback."""
-        article_ids = [r[0] for r in fused_results[:30]]
+        # Step 6: Deduplicate (on the rescored order, inside _format_results)
+        # Step 7: Format the fetched articles
+        # Step 8: Cross-encoder re-ranking (optional, disabled by default);
+        # it only needs the wider rerank pool, not the plain top-`limit` list
+        rerank_time = 0
+        if fusion_strategy == "rerank":
+            rerank_pool_results = self._format_results(
+                fused, articles, min(limit * 2, 20), boost_category, use_deduplication
+            )
+            start_rerank = time.time()
+            results = self.reranker.rerank(query, rerank_pool_results, top_k=limit)
+            rerank_time = (time.time() - start_rerank) * 1000
+        else:
+            results = self._format_results(
+                fused, articles, limit, boost_category, use_deduplication
+            )
+
+        return (intent, intent_conf, results, len(bm25_results), len(vector_results)), {
+            "embedding": embed_time,
+            "search": search_time,
+            "fusion": fusion_time,
+            "rerank": rerank_time,
+        }
+
+    def _result_cache_get(self, key: tuple):
+        with self._result_cache_lock:
+            entry = self._result_cache.get(key)
+            if entry is None:
+                return None
+            stored_at, value = entry
+            if time.monotonic() - stored_at > self.RESULT_CACHE_TTL:
+                del self._result_cache[key]
+                return None
+            self._result_cache.move_to_end(key)
+            return value
+
+    def _result_cache_put(self, key: tuple, value: tuple):
+        with self._result_cache_lock:
+            self._result_cache[key] = (time.monotonic(), value)
+            self._result_cache.move_to_end(key)
+            if len(self._result_cache) > self.RESULT_CACHE_SIZE:
+                self._result_cache.popitem(last=False)
+
+    def clear_result_cache(self):
+        with self._result_cache_lock:
+            self._result_cache.clear()
+
+    def _candidate_search(
+        self, query: str, query_embedding, vector_limit: int
+    ) -> Tuple[List[Tuple[str, float]], List[Tuple[str, float]], Dict[str, tuple]]:
+        """
+        Run BM25 (plainto_tsquery) and HNSW vector search concurrently.
+
+        Returns (bm25_results, vector_results, articles): the two ranked
+        (article_id, score) lists and the article rows keyed by UUID, with
+        quality_score and the BM25 and vector scores (None if absent) appended.
+        """
+        session = self._acquire_session()
+        try:
+            return self._session_candidate_search(session, query, query_embedding, vector_limit)
+        finally:
+            self._release_session(session)
+
+    def _session_candidate_search(
+        self, session: "SearchSession", query: str, query_embedding, vector_limit: int
+    ) -> Tuple[List[Tuple[str, float]], List[Tuple[str, float]], Dict[str, tuple]]:
+        vector_future = None
+        if self.vector_search_enabled and session.vector_cur is not None:
+            try:
+                self._prepare_vector_search(session)
+            except Exception as e:
+                print(f"Warning: Failed to re-prepare vector search: {e}")
+            vector_future = self._vector_pool.submit(
+                self._vector_search, session.vector_cur, query_embedding, vector_limit
+            )
+        bm25_rows = self._bm25_search(session.cur, query)
+        vector_rows = vector_future.result() if vector_future is not None else []
+
+        # article_id → [quality_score, bm25_score, vector_score]
+        scores = {}
+        bm25_results = []
+        for article_id, quality_score, score in bm25_rows:
+            scores[article_id] = [quality_score, score, None]
+            bm25_results.append((article_id, float(score)))
+
+        vector_results = []
+        for article_id, quality_score, score in vector_rows:
+            scores.setdefault(article_id, [quality_score, None, None])[2] = score
+            vector_results.append((article_id, float(score)))
+
+        rows = self._get_articles(session.cur, list(scores))
+        articles = {
+            article_id: rows[article_id] + tuple(values)
+            for article_id, values in scores.items()
+            if article_id in rows
+        }
+        return bm25_results, vector_results, articles
+
+    def _get_articles(self, cur, article_ids: list) -> Dict[str, tuple]:
+        """Article rows by id, from the article cache where possible"""
         if not article_ids:
-            return fused_results
-        q_scores = get_quality_scores(self.conn, article_ids)
-        adjusted = []
-        for article_id, score in fused_results:
-            qs = q_scores.get(article_id, 1.0)
-            adjusted.append((article_id, score * qs))
-        return sorted(adjusted, key=lambda x: x[1], reverse=True)
-
-    def _vector_search(
-        self, query_embedding, limit: int
-    ) -> List[Tuple[str, float]]:
-        """Execute HNSW vector semantic search"""
-        if not self.vector_search_enabled:
+            return {}
+        self._check_article_cache_version(cur)
+
+        rows = {}
+        with self._article_cache_lock:
+            for article_id in article_ids:
+                row = self._article_cache.get(article_id)
+                if row is not None:
+                    self._article_cache.move_to_end(article_id)
+                    rows[article_id] = row
+        misses = [article_id for article_id in article_ids if article_id not in rows]
+        if not misses:
+            return rows
+
+        try:
+            cur.execute("EXECUTE fetch_articles (%s)", (misses,))
+            fetched = cur.fetchall()
+        except Exception as e:
+            print(f"Article fetch error: {e}")
+            return rows
+
+        with self._article_cache_lock:
+            for row in fetched:
+                rows[row[0]] = row
+                self._article_cache[row[0]] = row
+            while len(self._article_cache) > self.ARTICLE_CACHE_SIZE:
+                self._article_cache.popitem(last=False)
+        return rows
+
+    def _check_article_cache_version(self, cur):
+        """
+        Clear the article cache if kb_articles changed (ingest, cleanup
+        scripts), and re-detect the halfvec index so sessions switch vector
+        queries when rebuild_indexes adds or drops it. Index DDL doesn't
+        move the row counters, so that runs on every check.
+        """
+        now = time.monotonic()
+        if now - self._article_cache_checked < self.ARTICLE_CACHE_CHECK_INTERVAL:
+            return
+        self._article_cache_checked = now
+        halfvec_dim = self._detect_halfvec_dim(cur, on_error=self.halfvec_dim)
+        if halfvec_dim != self.halfvec_dim:
+            kind = "halfvec" if halfvec_dim else "full-precision"
+            print(f"Vector search index changed; switching to the {kind} query")
+            self.halfvec_dim = halfvec_dim
+        try:
+            cur.execute(self.KB_VERSION_SQL)
+            row = cur.fetchone()
+        except Exception as e:
+            print(f"Warning: Failed to read kb_articles version: {e}")
+            return
+        version = row[0] if row else None
+        if version != self._article_cache_version:
+            with self._article_cache_lock:
+                self._article_cache.clear()
+            self._article_cache_version = version
+
+    def _bm25_search(self, cur, query: str) -> List[tuple]:
+        """Execute BM25 keyword search via FTS using plainto_tsquery"""
+        try:
+            cur.execute("EXECUTE search_bm25 (%s, %s)", (query, self.BM25_LIMIT))
+            return cur.fetchall()
+        except Exception as e:
+            print(f"BM25 search error: {e}")
             return []
 
-        embedding_str = "[" + ",".join(f"{x:.6f}" for x in query_embedding) + "]"
+    def _vector_search(self, cur, query_embedding, limit: int) -> List[tuple]:
+        """Execute HNSW vector semantic search on a session's vector connection"""
         try:
-            self.cur.execute(
-                """
-                SELECT id, 1 - (embedding <=> %s::vector) as cosine_similarity
-                FROM kb_articles
-                WHERE embedding IS NOT NULL AND is_active = true
-                ORDER BY embedding <=> %s::vector
-                LIMIT %s
-                """,
-                (embedding_str, embedding_str, limit),
-            )
-            return [(str(row[0]), float(row[1])) for row in self.cur.fetchall()]
+            cur.execute("EXECUTE search_vector (%s, %s)", (query_embedding, limit))
+            return cur.fetchall()
         except Exception as e:
             print(f"Vector search unavailable, falling back to BM25 only: {e}")
             self.vector_search_enabled = False
             return []
 
     def _deduplicate_results(
-        self, fused_results: List[Tuple[str, float]]
+        self, fused_results: List[Tuple[str, float]], articles: Dict[str, tuple]
     ) -> List[Tuple[str, float]]:
         """Remove near-duplicate articles (same source document)"""
-        article_ids = [r[0] for r in fused_results]
-        if not article_ids:
-            return fused_results
-
-        placeholders = ",".join(["%s"] * len(article_ids))
-        self.cur.execute(
-            f"""
-            SELECT id, source_document_id, chunk_index
-            FROM kb_articles WHERE id IN ({placeholders})
-            """,
-            article_ids,
-        )
-
-        doc_map = {str(row[0]): (row[1], row[2]) for row in self.cur.fetchall()}
-
         seen_docs = {}
         deduplicated = []
 
         for article_id, fusion_score in fused_results:
-            if article_id not in doc_map:
+            if article_id not in articles:
                 deduplicated.append((article_id, fusion_score))
                 continue
 
-            doc_id, chunk_idx = doc_map[article_id]
+            doc_id = articles[article_id][4]
 
             if doc_id is None or doc_id not in seen_docs:
                 if doc_id is not None:
@@ -267,48 +556,49 @@ class HybridSearchEngine:
 
         return deduplicated
 
-    def _fetch_and_format_results(
+    def _format_results(
         self,
         fused: List[Tuple[str, float]],
-        bm25_results: List[Tuple[str, float]],
-        vector_results: List[Tuple[str, float]],
+        articles: Dict[str, tuple],
         limit: int,
+        boost_category: str = None,
+        deduplicate: bool = False,
     ) -> List[Dict]:
-        """Fetch full article data and format for response"""
-        bm25_map = {r[0]: r[1] for r in bm25_results}
-        vector_map = {r[0]: r[1] for r in vector_results}
+        """
+        Format fetched articles for response.
 
-        article_ids = [r[0] for r in fused[:limit]]
-        if not article_ids:
-            return []
+        Category boost and the feedback quality score are applied to every
+        fused candidate, which are re-sorted and (optionally) deduplicated
+        before the best `limit` are kept, so the chunk kept per source
+        document is its best-scoring one.
+        """
+        rescored = []
+        for article_id, fusion_score in fused:
+            if article_id not in articles:
+                continue
 
-        placeholders = ",".join(["%s"] * len(article_ids))
-        self.cur.execute(
-            f"""
-            SELECT id, title, content, category, source_document_id, chunk_index, heading_path
-            FROM kb_articles WHERE id IN ({placeholders})
-            """,
-            article_ids,
-        )
+            article = articles[article_id]
+            if boost_category and article[3] == boost_category:
+                fusion_score *= self.CATEGORY_BOOST
+            fusion_score *= float(article[7] or 1.0)
+            rescored.append((article_id, fusion_score))
 
-        articles = {str(row[0]): row for row in self.cur.fetchall()}
+        rescored.sort(key=lambda x: x[1], reverse=True)
+        if deduplicate:
+            rescored = self._deduplicate_results(rescored, articles)
 
         results = []
-        for article_id, fusion_score in fused[:limit]:
-            if article_id not in articles:
-                continue
-
+        for article_id, fusion_score in rescored[:limit]:
             article = articles[article_id]
-            content = article[2] or ""
 
             results.append(
                 {
                     "article_id": str(article[0]),
                     "title": article[1],
-                    "content_preview": content[:200] + ("..." if len(content) > 200 else ""),
+                    "content_preview": article[2],
                     "category": article[3],
-                    "bm25_score": bm25_map.get(article_id, 0.0),
-                    "vector_score": vector_map.get(article_id, 0.0),
+                    "bm25_score": float(article[8] or 0.0),
+                    "vector_score": float(article[9] or 0.0),
                     "fusion_score": fusion_score,
                     "source_document_id": article[4],
                     "heading_path": article[6],
@@ -328,41 +618,37 @@ class HybridSearchEngine:
         time_ms: float,
         fusion_strategy: str,
     ):
-        """Log search query to query_performance table"""
-        try:
-            self.cur.execute(
-                """
-                INSERT INTO query_performance
-                    (query_text, ef_search_used, bm25_results_count,
-                     vector_results_count, results_returned, response_time_ms,
-                     recall_estimate, category_filter, intent_confidence, fusion_strategy)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                RETURNING id
-                """,
-                (
-                    query,
-                    100,
-                    bm25_count,
-                    vector_count,
-                    results_count,
-                    time_ms,
-                    confidence,
-                    intent,
-                    confidence,
-                    fusion_strategy,
-                ),
+        """
+        Queue the search for logging to query_performance.
+
+        The query_id is generated here so the response does not wait on the
+        INSERT; QueryLogWriter writes it in the background.
+        """
+        query_id = str(uuid.uuid4())
+        self.query_log.log(
+            (
+                query_id,
+                query,
+                100,
+                bm25_count,
+                vector_count,
+                results_count,
+                time_ms,
+                confidence,
+                intent,
+                confidence,
+                fusion_strategy,
             )
-            row = self.cur.fetchone()
-            return str(row[0]) if row else None
-        except Exception as e:
-            print(f"Warning: Failed to log query: {e}")
-            return None
+        )
+        return query_id
 
     def _log_feedback(
         self, query_id: str, result_rank: int, rating: str, comment: str = "",
         article_id: str = None
     ):
         """Log user feedback on search results"""
+        # The rated query may still be queued for logging
+        self.query_log.wait_for(query_id)
         try:
             self.cur.execute(
                 """
@@ -373,6 +659,9 @@ class HybridSearchEngine:
             )
         except Exception as e:
             print(f"Feedback logging error: {e}")
+            return
+        # Feedback can change quality scores; don't keep serving stale rankings
+        self.clear_result_cache()
 
     def _get_stats(self) -> dict:
         """Get search statistics for monitoring"""
@@ -434,8 +723,160 @@ class HybridSearchEngine:
         }
 
     def close(self):
+        self.query_embedder.close()
+        self.query_log.close()
+        self._vector_pool.shutdown()
+        while True:
+            try:
+                self._sessions.get_nowait().close()
+            except queue.Empty:
+                break
         self.cur.close()
-        self.conn.close()
+        put_db_conn(self.conn, close=bool(self.conn.closed))
+
+
+class SearchSession:
+    """
+    Connections one search runs on: BM25 and article fetches on `cur`, vector
+    search on `vector_cur` (None when vector search is unavailable), each with
+    the search statements prepared.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.cur = conn.cursor()
+        self.vector_conn = None
+        self.vector_cur = None
+        # SQL behind the prepared search_vector statement
+        self.vector_sql = None
+
+    @property
+    def broken(self) -> bool:
+        return bool(self.conn.closed or (self.vector_conn is not None and self.vector_conn.closed))
+
+    def close(self):
+        """Hand both connections back to the pool, discarding broken ones."""
+        for conn in (self.conn, self.vector_conn):
+            if conn is None:
+                continue
+            discard = bool(conn.closed)
+            if not discard:
+                try:
+                    # Drop the prepared statements and SETs so the next
+                    # borrower can PREPARE the same names
+                    with conn.cursor() as cur:
+                        cur.execute("DISCARD ALL")
+                except Exception:
+                    discard = True
+            put_db_conn(conn, close=discard)
+
+
+class QueryLogWriter:
+    """
+    Write query_performance rows from a background thread.
+
+    Searches enqueue rows and return immediately; the worker inserts them
+    with execute_values every BATCH_SIZE rows or FLUSH_INTERVAL seconds,
+    over its own pooled connection.
+    """
+
+    BATCH_SIZE = 100
+    FLUSH_INTERVAL = 0.5  # seconds
+    # A failed batch is retried once on a fresh connection before it's dropped
+    WRITE_ATTEMPTS = 2
+    # Longest wait_for() blocks a caller (feedback) on one row
+    WAIT_TIMEOUT = 5.0  # seconds
+    INSERT_SQL = """
+        INSERT INTO query_performance
+            (id, query_text, ef_search_used, bm25_results_count,
+             vector_results_count, results_returned, response_time_ms,
+             recall_estimate, category_filter, intent_confidence, fusion_strategy)
+        VALUES %s
+    """
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        # query_ids queued but not yet written or dropped
+        self._pending = set()
+        self._done = threading.Condition()
+        self._conn = None
+        self._worker = threading.Thread(target=self._run, name="query-log-writer", daemon=True)
+        self._worker.start()
+
+    def log(self, row: tuple):
+        with self._done:
+            self._pending.add(row[0])
+        self._queue.put(row)
+
+    def wait_for(self, query_id: str, timeout: float = None) -> bool:
+        """
+        Block until the row for query_id has been written (or dropped on
+        error). Rows queued later never extend the wait. Returns False on
+        timeout.
+        """
+        if timeout is None:
+            timeout = self.WAIT_TIMEOUT
+        with self._done:
+            return self._done.wait_for(lambda: query_id not in self._pending, timeout)
+
+    def close(self):
+        self._queue.put(None)
+        self._worker.join()
+
+    def _run(self):
+        stop = False
+        while not stop:
+            item = self._queue.get()
+            batch = []
+            if item is None:
+                stop = True
+            else:
+                batch.append(item)
+                deadline = time.monotonic() + self.FLUSH_INTERVAL
+                while len(batch) < self.BATCH_SIZE:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = self._queue.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        stop = True
+                        break
+                    batch.append(item)
+
+            if batch:
+                try:
+                    self._write(batch)
+                finally:
+                    with self._done:
+                        self._pending.difference_update(row[0] for row in batch)
+                        self._done.notify_all()
+
+        if self._conn is not None:
+            put_db_conn(self._conn, close=bool(self._conn.closed))
+
+    def _write(self, batch: List[tuple]):
+        from psycopg2.extras import execute_values
+
+        for attempt in range(1, self.WRITE_ATTEMPTS + 1):
+            try:
+                if self._conn is None:
+                    self._conn = get_db_conn()
+                    self._conn.autocommit = True
+                cur = self._conn.cursor()
+                execute_values(cur, self.INSERT_SQL, batch, page_size=self.BATCH_SIZE)
+                cur.close()
+                return
+            except Exception as e:
+                print(
+                    f"Warning: Failed to log {len(batch)} queries "
+                    f"(attempt {attempt}/{self.WRITE_ATTEMPTS}): {e}"
+                )
+                if self._conn is not None:
+                    put_db_conn(self._conn, close=True)
+                    self._conn = None
 
 
 if __name__ == "__main__":
@@ -8,6 +8,7 @@ import os
 import sys
 import uuid
 import re
+from concurrent.futures import ThreadPoolExecutor
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 from db_config import connect_db
@@ -23,13 +24,19 @@ CATEGORY_MAP = {
 }
 
 SKIP_FILES = {"INDEX.md"}
+READ_WORKERS = 16
+_HEADING_RE = re.compile(r"^#+\s+(.+)$")
+
+
+def read_file(filepath: str) -> str:
+    with open(filepath, "r", encoding="utf-8") as f:
+        return f.read()
 
 
 def extract_title(content: str, filename: str) -> str:
     """Extract title from first markdown heading or derive from filename."""
-    for line in content.split("\n"):
-        line = line.strip()
-        match = re.match(r"^#+\s+(.+)$", line)
+    for line in content.splitlines():
+        match = _HEADING_RE.match(line.lstrip())
         if match:
             return match.group(1).strip()
     # Fallback: derive from filename
@@ -53,9 +60,14 @@ def main():
     print("=" * 70)
     print()
 
+    from pgvector.psycopg2 import register_vector
+    from psycopg2.extras import execute_values
+
     # Connect to database
     conn = connect_db()
     conn.autocommit = True
+    # Send numpy embeddings as vector values without string formatting
+    register_vector(conn)
     cur = conn.cursor()
 
     # Initialize embedding service
@@ -84,12 +96,12 @@ def main():
     if deleted > 0:
         print(f"Removed {deleted} existing curated KB articles (clean re-ingest)\n")
 
-    # Read all files
-    articles = []
-    for filepath, filename, category in files_to_ingest:
-        with open(filepath, "r", encoding="utf-8") as f:
-            raw_content = f.read()
+    # Read all files concurrently (I/O-bound), then clean them in order
+    with ThreadPoolExecutor(max_workers=READ_WORKERS) as pool:
+        raw_contents = list(pool.map(read_file, (f[0] for f in files_to_ingest)))
 
+    articles = []
+    for (filepath, filename, category), raw_content in zip(files_to_ingest, raw_contents):
         content = clean_content(raw_content)
         title = extract_title(content, filename)
 
@@ -110,38 +122,37 @@ def main():
 
     print(f"Generated {len(embeddings)} embeddings ({embedder.dimension} dims each)\n")
 
-    # Insert into PostgreSQL
-    inserted = 0
-    for article, embedding in zip(articles, embeddings):
-        article_id = str(uuid.uuid4())
-        embedding_str = "[" + ",".join(f"{x:.6f}" for x in embedding) + "]"
-
-        cur.execute(
-            """
-            INSERT INTO kb_articles
-                (id, title, content, category, article_type, embedding,
-                 embedding_model, embedding_version,
-                 is_active, source_document_id, chunk_index, heading_path)
-            VALUES
-                (%s, %s, %s, %s, %s, %s::vector, %s, %s,
-                 true, %s, %s, %s)
-            """,
-            (
-                article_id,
-                article["title"],
-                article["content"],
-                article["category"],
-                article["category"].lower(),
-                embedding_str,
-                "all-MiniLM-L6-v2",
-                1,
-                "curated_" + article["title"].lower().replace(" ", "_"),
-                0,
-                article["filename"],
-            ),
+    # Insert into PostgreSQL in batched multi-row INSERTs
+    rows = [
+        (
+            str(uuid.uuid4()),
+            article["title"],
+            article["content"],
+            article["category"],
+            article["category"].lower(),
+            embedding,
+            "all-MiniLM-L6-v2",
+            1,
+            "curated_" + article["title"].lower().replace(" ", "_"),
+            0,
+            article["filename"],
         )
-        inserted += 1
-        print(f"  Inserted: [{article['category']}] {article['title']}")
+        for article, embedding in zip(articles, embeddings)
+    ]
+    execute_values(
+        cur,
+        """
+        INSERT INTO kb_articles
+            (id, title, content, category, article_type, embedding,
+             embedding_model, embedding_version,
+             is_active, source_document_id, chunk_index, heading_path)
+        VALUES %s
+        """,
+        rows,
+        template="(%s, %s, %s, %s, %s, %s, %s, %s, true, %s, %s, %s)",
+        page_size=200,
+    )
+    inserted = len(rows)
 
     print(f"\n{'=' * 70}")
     print(f"  INGESTION COMPLETE: {inserted} articles inserted")
@@ -5,21 +5,145 @@ Uses trained ML classifier (TF-IDF + Logistic Regression) with keyword fallback.
 Classifies queries as policy/procedure/reference/unknown and measures confidence.
 """
 
+import functools
 import os
 import re
-from typing import Tuple
+from typing import List, Tuple
+
+try:
+    import ahocorasick
+except ImportError:  # optional C extension; keyword scoring falls back to Python scans
+    ahocorasick = None
+
+try:
+    import numpy as np
+except ImportError:  # optional; without it only the joblib model can be served
+    np = None
 
 _MODEL = None
 _MODEL_LOADED = False
 
+_MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _murmurhash3_32(key: bytes, seed: int = 0) -> int:
+    """Signed 32-bit MurmurHash3 (x86), the hash HashingVectorizer buckets tokens with."""
+    c1, c2, mask = 0xCC9E2D51, 0x1B873593, 0xFFFFFFFF
+    h = seed & mask
+    length = len(key)
+    tail_start = length - length % 4
+    for i in range(0, tail_start, 4):
+        k = int.from_bytes(key[i:i + 4], "little")
+        k = (k * c1) & mask
+        k = ((k << 15) | (k >> 17)) & mask
+        k = (k * c2) & mask
+        h ^= k
+        h = ((h << 13) | (h >> 19)) & mask
+        h = (h * 5 + 0xE6546B64) & mask
+    k = 0
+    for shift, byte in enumerate(key[tail_start:]):
+        k |= byte << (8 * shift)
+    if k:
+        k = (k * c1) & mask
+        k = ((k << 15) | (k >> 17)) & mask
+        k = (k * c2) & mask
+        h ^= k
+    h ^= length
+    h ^= h >> 16
+    h = (h * 0x85EBCA6B) & mask
+    h ^= h >> 13
+    h = (h * 0xC2B2AE35) & mask
+    h ^= h >> 16
+    return h - 0x100000000 if h & 0x80000000 else h
+
+
+class FlatIntentModel:
+    """
+    NumPy-only replica of the trained pipeline (hashed word n-grams ->
+    sublinear TF-IDF -> linear SVM -> per-class sigmoid calibration), loaded
+    from the flat intent_model.npz so serving never imports sklearn or
+    unpickles estimators. Exposes the predict_proba/classes_ subset the
+    detector uses.
+    """
+
+    TOKEN_RE = re.compile(r"(?u)\b\w\w+\b")
+
+    def __init__(self, arrays):
+        self.n_features = int(arrays["n_features"])
+        self.ngram_range = tuple(int(n) for n in arrays["ngram_range"])
+        self.idf = arrays["idf"]
+        self.coef = arrays["coef"]
+        self.intercept = arrays["intercept"]
+        self.calib_a = arrays["calib_a"]
+        self.calib_b = arrays["calib_b"]
+        self.classes_ = arrays["classes"]
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as arrays:
+            return cls({name: arrays[name] for name in arrays.files})
+
+    def _bucket(self, term: str) -> int:
+        h = _murmurhash3_32(term.encode("utf-8"))
+        if h == -2147483648:
+            # Matches sklearn's definition of abs(-2**31) % n_features
+            return (2147483647 - (self.n_features - 1)) % self.n_features
+        return abs(h) % self.n_features
+
+    def transform(self, queries) -> "np.ndarray":
+        """L2-normalized sublinear TF-IDF rows (dense; queries are short)."""
+        min_n, max_n = self.ngram_range
+        X = np.zeros((len(queries), self.n_features), dtype=np.float32)
+        for row, query in enumerate(queries):
+            tokens = self.TOKEN_RE.findall(query.lower())
+            counts = {}
+            for n in range(min_n, max_n + 1):
+                for i in range(len(tokens) - n + 1):
+                    idx = self._bucket(" ".join(tokens[i:i + n]))
+                    counts[idx] = counts.get(idx, 0) + 1
+            if not counts:
+                continue
+            cols = np.fromiter(counts.keys(), dtype=np.intp, count=len(counts))
+            tf = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+            weights = (np.log(tf) + 1.0) * self.idf[cols]
+            X[row, cols] = weights / np.linalg.norm(weights)
+        return X
+
+    def predict_proba(self, queries) -> "np.ndarray":
+        scores = self.transform(queries) @ self.coef.T + self.intercept
+        proba = 1.0 / (1.0 + np.exp(self.calib_a * scores + self.calib_b))
+        if len(self.classes_) == 2:
+            proba = np.column_stack([1.0 - proba[:, 0], proba[:, 0]])
+        else:
+            # Per-class sigmoids don't sum to one; uniform if all are zero
+            total = proba.sum(axis=1, keepdims=True)
+            proba = np.divide(
+                proba, total,
+                out=np.full_like(proba, 1.0 / len(self.classes_)),
+                where=total != 0,
+            )
+        proba[(proba > 1.0) & (proba <= 1.0 + 1e-5)] = 1.0
+        return proba
+
 
 def _load_model():
-    """Load the trained intent classifier if available."""
+    """
+    Load the trained intent classifier if available, preferring the flat
+    intent_model.npz export (NumPy only) over the pickled joblib pipeline.
+    """
     global _MODEL, _MODEL_LOADED
     if _MODEL_LOADED:
         return _MODEL
     _MODEL_LOADED = True
-    model_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "intent_model.joblib")
+    flat_path = os.path.join(_MODEL_DIR, "intent_model.npz")
+    if np is not None and os.path.exists(flat_path):
+        try:
+            _MODEL = FlatIntentModel.load(flat_path)
+            print(f"Intent classifier loaded from {flat_path}")
+            return _MODEL
+        except Exception as e:
+            print(f"Failed to load flat intent classifier: {e}")
+    model_path = os.path.join(_MODEL_DIR, "intent_model.joblib")
     if os.path.exists(model_path):
         try:
             import joblib
@@ -31,6 +155,31 @@ def _load_model():
     return _MODEL
 
 
+def _trie_regex(phrases) -> "re.Pattern":
+    """
+    Compile phrases into one prefix-factored alternation, e.g.
+    "how do i" / "how do you" / "how to" -> "how (?:do (?:i|you)|to)".
+    The pattern sits in a lookahead so findall() reports overlapping hits.
+    """
+    trie = {}
+    for phrase in phrases:
+        node = trie
+        for ch in phrase:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def render(node):
+        optional = "" in node
+        alts = [re.escape(ch) + render(child) for ch, child in sorted(node.items()) if ch]
+        if not alts:
+            return ""
+        if len(alts) == 1 and not optional:
+            return alts[0]
+        return "(?:" + "|".join(alts) + ")" + ("?" if optional else "")
+
+    return re.compile("(?=(" + render(trie) + "))")
+
+
 class IntentDetector:
     """Detect query intent using ML classifier with keyword fallback."""
 
@@ -39,6 +188,7 @@ class IntentDetector:
         "can i", "am i allowed", "am i permitted", "is it allowed",
         "is it okay", "are we allowed", "policy",
     ]
+    POLICY_PRIORITY_RE = _trie_regex(POLICY_PRIORITY)
     POLICY_KEYWORDS = {
         "forbidden": ["forbidden", "not allowed", "banned", "prohibited", "restricted"],
         "governance": ["rule", "must", "shall", "compliance"],
@@ -50,6 +200,7 @@ class IntentDetector:
     PROCEDURE_PRIORITY = [
         "how do i", "how to", "how do you", "how can i", "steps to",
     ]
+    PROCEDURE_PRIORITY_RE = _trie_regex(PROCEDURE_PRIORITY)
     PROCEDURE_KEYWORDS = {
         "action": ["procedure", "process", "walkthrough", "guide"],
         "request": ["request", "apply for", "submit", "fill out", "approval"],
@@ -62,6 +213,7 @@ class IntentDetector:
     REFERENCE_PRIORITY = [
         "what is", "what are", "what does", "tell me about",
     ]
+    REFERENCE_PRIORITY_RE = _trie_regex(REFERENCE_PRIORITY)
     REFERENCE_KEYWORDS = {
         "definition": ["definition", "explain", "describe", "meaning"],
         "information": ["about", "information", "details", "overview", "summary"],
@@ -69,16 +221,75 @@ class IntentDetector:
         "requirements": ["requirement", "requirements"],
     }
 
+    # Repeat queries skip classification entirely
+    DETECT_CACHE_SIZE = 4096
+    # Queries shorter than this cannot contain any keyword or phrase
+    MIN_QUERY_LENGTH = 3
+
     @staticmethod
     def detect(query: str) -> Tuple[str, float]:
         """
         Detect query intent using ML model (primary) or keywords (fallback).
         Returns: (intent_type, confidence_0_to_1)
         """
+        q = IntentDetector._normalize(query)
+        if q is None:
+            return "unknown", 0.0
+        return IntentDetector._detect_cached(q)
+
+    @staticmethod
+    def detect_batch(queries: List[str]) -> List[Tuple[str, float]]:
+        """
+        Detect intents for many queries with one classifier call.
+        Returns one (intent_type, confidence_0_to_1) per query, in order.
+        """
+        # Same normalization and short-query cutoff as detect()
+        results = [("unknown", 0.0)] * len(queries)
+        pending = {}
+        for i, query in enumerate(queries):
+            q = IntentDetector._normalize(query)
+            if q is not None:
+                pending[i] = q
+        if not pending:
+            return results
+
+        model = _load_model()
+        if model is None:
+            for i, q in pending.items():
+                results[i] = IntentDetector._detect_keywords(q)
+            return results
+
+        proba = model.predict_proba(list(pending.values()))
+        best_idx = proba.argmax(axis=1)
+        best_conf = proba.max(axis=1)
+        intents = model.classes_[best_idx]
+
+        for i, intent, confidence in zip(pending, intents, best_conf.tolist()):
+            if confidence < 0.4:
+                results[i] = ("unknown", round(1.0 - confidence, 2))
+            else:
+                results[i] = (intent, round(confidence, 2))
+        return results
+
+    @staticmethod
+    def _normalize(query: str):
+        """Stripped, lowercased query, or None if too short to classify."""
+        q = query.strip().lower()
+        if len(q) < IntentDetector.MIN_QUERY_LENGTH:
+            return None
+        return q
+
+    @staticmethod
+    @functools.lru_cache(maxsize=DETECT_CACHE_SIZE)
+    def _detect_cached(q_lower: str) -> Tuple[str, float]:
+        """
+        Memoized detection on the stripped, lowercased query. Both paths are
+        case-insensitive (the TF-IDF vectorizer lowercases its input).
+        """
         model = _load_model()
         if model is not None:
-            return IntentDetector._detect_ml(query, model)
-        return IntentDetector._detect_keywords(query)
+            return IntentDetector._detect_ml(q_lower, model)
+        return IntentDetector._detect_keywords(q_lower)
 
     @staticmethod
     def _detect_ml(query: str, model) -> Tuple[str, float]:
@@ -92,7 +303,7 @@ class IntentDetector:
         # If confidence is below threshold, fall back to "unknown"
         if confidence < 0.4:
             intent = "unknown"
-            confidence = float(1.0 - max(proba))
+            confidence = float(1.0 - proba[best_idx])
 
         return intent, round(confidence, 2)
 
@@ -101,21 +312,23 @@ class IntentDetector:
         """Keyword-based fallback intent detection."""
         q_lower = query.lower()
 
-        policy_score = IntentDetector._score_intent(
-            q_lower, IntentDetector.POLICY_KEYWORDS, IntentDetector.POLICY_PRIORITY)
-        procedure_score = IntentDetector._score_intent(
-            q_lower, IntentDetector.PROCEDURE_KEYWORDS, IntentDetector.PROCEDURE_PRIORITY)
-        reference_score = IntentDetector._score_intent(
-            q_lower, IntentDetector.REFERENCE_KEYWORDS, IntentDetector.REFERENCE_PRIORITY)
-
-        scores = {
-            "policy": policy_score,
-            "procedure": procedure_score,
-            "reference": reference_score,
-        }
+        if _KEYWORD_AUTOMATON is not None:
+            policy_score, procedure_score, reference_score = _score_automaton(q_lower)
+        else:
+            policy_score = IntentDetector._score_intent(
+                q_lower, IntentDetector.POLICY_KEYWORDS, IntentDetector.POLICY_PRIORITY_RE)
+            procedure_score = IntentDetector._score_intent(
+                q_lower, IntentDetector.PROCEDURE_KEYWORDS, IntentDetector.PROCEDURE_PRIORITY_RE)
+            reference_score = IntentDetector._score_intent(
+                q_lower, IntentDetector.REFERENCE_KEYWORDS, IntentDetector.REFERENCE_PRIORITY_RE)
 
-        intent = max(scores, key=scores.get)
-        confidence = scores[intent]
+        # Ties resolve policy > procedure > reference
+        if policy_score >= procedure_score and policy_score >= reference_score:
+            intent, confidence = "policy", policy_score
+        elif procedure_score >= reference_score:
+            intent, confidence = "procedure", procedure_score
+        else:
+            intent, confidence = "reference", reference_score
 
         if confidence < 0.1:
             intent = "unknown"
@@ -123,22 +336,101 @@ class IntentDetector:
         return intent, confidence
 
     @staticmethod
-    def _score_intent(query: str, keywords_dict: dict, priority_phrases: list) -> float:
+    def _score_intent(query: str, keywords_dict: dict, priority_re: "re.Pattern") -> float:
         """Score a query against priority phrases and keyword dictionary."""
-        total_score = 0.0
-        for phrase in priority_phrases:
-            if phrase in query:
-                total_score += 2.0
+        # Each distinct priority phrase counts once, however often it appears
+        total_score = 2.0 * len(set(priority_re.findall(query)))
         for category, keywords in keywords_dict.items():
             for keyword in keywords:
                 if keyword in query:
-                    if re.search(rf"\b{re.escape(keyword)}\b", query):
+                    if _BOUNDARY_PATTERNS[keyword].search(query):
                         total_score += 1.0
                     else:
                         total_score += 0.5
         return min(1.0, total_score / 5.0)
 
 
+# Word-boundary pattern per keyword for the pure-Python fallback scan
+_BOUNDARY_PATTERNS = {
+    keyword: re.compile(rf"\b{re.escape(keyword)}\b")
+    for group in (
+        IntentDetector.POLICY_KEYWORDS,
+        IntentDetector.PROCEDURE_KEYWORDS,
+        IntentDetector.REFERENCE_KEYWORDS,
+    )
+    for keywords in group.values()
+    for keyword in keywords
+}
+
+
+def _is_word_char(c: str) -> bool:
+    """True for characters the regex word-boundary check treats as word characters."""
+    return c.isalnum() or c == "_"
+
+
+def _build_keyword_automaton():
+    """
+    Index every priority phrase and keyword in one Aho-Corasick automaton.
+    Each entry maps to (term, [(intent_slot, is_priority), ...]) so a single
+    pass over the query scores all three intents.
+    """
+    if ahocorasick is None:
+        return None
+
+    automaton = ahocorasick.Automaton()
+    groups = (
+        (IntentDetector.POLICY_KEYWORDS, IntentDetector.POLICY_PRIORITY),
+        (IntentDetector.PROCEDURE_KEYWORDS, IntentDetector.PROCEDURE_PRIORITY),
+        (IntentDetector.REFERENCE_KEYWORDS, IntentDetector.REFERENCE_PRIORITY),
+    )
+    payloads = {}
+    for slot, (keywords_dict, priority_phrases) in enumerate(groups):
+        for phrase in priority_phrases:
+            payloads.setdefault(phrase, []).append((slot, True))
+        for keywords in keywords_dict.values():
+            for keyword in keywords:
+                payloads.setdefault(keyword, []).append((slot, False))
+
+    for term, entries in payloads.items():
+        automaton.add_word(term, (term, entries))
+    automaton.make_automaton()
+    return automaton
+
+
+_KEYWORD_AUTOMATON = _build_keyword_automaton()
+
+
+def _score_automaton(q_lower: str) -> Tuple[float, float, float]:
+    """
+    Score all intents in one automaton pass. Same rules as _score_intent:
+    each phrase/keyword counts once, priority phrases add 2.0, keywords add
+    1.0 if any occurrence sits on word boundaries and 0.5 otherwise.
+    """
+    last = len(q_lower) - 1
+    matched = {}
+    for end, (term, entries) in _KEYWORD_AUTOMATON.iter(q_lower):
+        start = end - len(term) + 1
+        bounded = (
+            (start == 0 or not _is_word_char(q_lower[start - 1]))
+            and (end == last or not _is_word_char(q_lower[end + 1]))
+        )
+        if bounded or term not in matched:
+            matched[term] = (entries, bounded)
+
+    totals = [0.0, 0.0, 0.0]
+    for entries, bounded in matched.values():
+        for slot, is_priority in entries:
+            if is_priority:
+                totals[slot] += 2.0
+            else:
+                totals[slot] += 1.0 if bounded else 0.5
+    return (
+        min(1.0, totals[0] / 5.0),
+        min(1.0, totals[1] / 5.0),
+        min(1.0, totals[2] / 5.0),
+    )
+
+
 if __name__ == "__main__":
     print("Testing Intent Detection\n")
 
@@ -4,14 +4,188 @@ Rebuild FTS tsvectors and embeddings for modified articles.
 Regenerates embeddings for articles whose content changed (merged/expanded).
 """
 
+import io
 import sys
 import os
+import queue
+import struct
+import threading
 import time
+import uuid
+from itertools import islice
+
+import numpy as np
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 from db_config import connect_db
 from embedding_service import EmbeddingService
 
+# Partial indexes matching the hybrid search predicates, so inactive and
+# unembedded rows are skipped at the index level. Where pgvector >= 0.7
+# provides halfvec, the HNSW index is built on a half-precision copy of the
+# embedding: half the index size and memory traffic per distance, at
+# near-identical recall. {dim} is the embedding column's declared dimension.
+SEARCH_INDEXES = {
+    "kb_articles_fts_active_idx": """
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS kb_articles_fts_active_idx
+        ON kb_articles USING gin (fts_content)
+        WHERE is_active = true
+    """,
+}
+HALFVEC_INDEXES = {
+    "kb_articles_embed_half_active_idx": """
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS kb_articles_embed_half_active_idx
+        ON kb_articles USING hnsw ((embedding::halfvec({dim})) halfvec_cosine_ops)
+        WITH (m = 16, ef_construction = 64)
+        WHERE embedding IS NOT NULL AND is_active = true
+    """,
+}
+# Full-precision HNSW indexes, used only without halfvec support
+VECTOR_INDEXES = {
+    "kb_articles_embed_active_idx": """
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS kb_articles_embed_active_idx
+        ON kb_articles USING hnsw (embedding vector_cosine_ops)
+        WITH (m = 16, ef_construction = 64)
+        WHERE embedding IS NOT NULL AND is_active = true
+    """,
+}
+# Full-precision HNSW indexes no query uses once the halfvec index exists
+FULL_PRECISION_HNSW_INDEXES = ("kb_articles_embed_active_idx", "kb_articles_embedding_hnsw_idx")
+
+EMBEDDING_DIM_SQL = """
+    SELECT atttypmod FROM pg_attribute
+    WHERE attrelid = 'kb_articles'::regclass AND attname = 'embedding'
+"""
+HALFVEC_TYPE_SQL = "SELECT to_regtype('halfvec') IS NOT NULL"
+
+
+def halfvec_available(cur) -> bool:
+    """True if the installed pgvector has the halfvec type (>= 0.7)."""
+    cur.execute(HALFVEC_TYPE_SQL)
+    return bool(cur.fetchone()[0])
+
+
+def ensure_search_indexes(cur) -> bool:
+    """
+    Idempotently create the search indexes (needs an autocommit connection).
+    With halfvec support and a typed embedding column the half-precision
+    HNSW index replaces the full-precision ones, which are dropped; returns
+    whether it is in use. Running API servers notice the swap on their next
+    periodic index check (HybridSearchEngine.ARTICLE_CACHE_CHECK_INTERVAL)
+    and re-prepare their vector query.
+    """
+    dim = None
+    use_halfvec = halfvec_available(cur)
+    if use_halfvec:
+        cur.execute(EMBEDDING_DIM_SQL)
+        dim = cur.fetchone()[0]
+        # atttypmod is -1 for an untyped vector column; halfvec needs a dimension
+        use_halfvec = dim > 0
+    if use_halfvec:
+        indexes = dict(SEARCH_INDEXES, **HALFVEC_INDEXES)
+    else:
+        indexes = dict(SEARCH_INDEXES, **VECTOR_INDEXES)
+    for sql in indexes.values():
+        cur.execute(sql.format(dim=dim))
+    if use_halfvec:
+        for name in FULL_PRECISION_HNSW_INDEXES:
+            cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+    return use_halfvec
+
+
+# Each embedding batch is COPYed in binary form (raw float4s, no text
+# formatting or parsing) into a session temp table, then applied with one
+# prepared UPDATE ... FROM
+STAGING_TABLE_SQL = """
+    CREATE TEMP TABLE IF NOT EXISTS rebuild_embeddings (
+        id uuid PRIMARY KEY,
+        embedding vector
+    )
+"""
+STAGING_COPY_SQL = "COPY rebuild_embeddings (id, embedding) FROM STDIN WITH (FORMAT binary)"
+EMBEDDING_UPDATE_SQL = """
+    UPDATE kb_articles AS k
+    SET embedding = r.embedding
+    FROM rebuild_embeddings AS r
+    WHERE k.id = r.id
+"""
+
+
+def prepare_embedding_writes(cur):
+    """
+    Set up the session for write_embedding_batch: create the staging table
+    and PREPARE the UPDATE once so batches skip parse and plan. Commits don't
+    wait for WAL flush; a crash can only lose the last few batches, which
+    these rerunnable scripts simply redo.
+    """
+    cur.execute(STAGING_TABLE_SQL)
+    cur.execute("PREPARE apply_embeddings AS " + EMBEDDING_UPDATE_SQL)
+    cur.execute("SET synchronous_commit = off")
+
+
+def write_embedding_batch(cur, ids, embeddings):
+    """Store one batch of embeddings (after prepare_embedding_writes)."""
+    cur.copy_expert(STAGING_COPY_SQL, io.BytesIO(encode_copy_rows(ids, embeddings)))
+    cur.execute("EXECUTE apply_embeddings")
+    cur.execute("TRUNCATE rebuild_embeddings")
+
+
+_COPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack("!ii", 0, 0)
+_COPY_TRAILER = struct.pack("!h", -1)
+
+
+def encode_copy_rows(ids, embeddings) -> bytes:
+    """
+    Encode (uuid, vector) rows as a PostgreSQL binary COPY stream.
+    pgvector's binary form is int16 dim, int16 unused (0), then dim float4s.
+    """
+    vectors = np.asarray(embeddings, dtype=">f4")
+    count, dim = vectors.shape
+    row_dtype = np.dtype([
+        ("field_count", ">i2"),
+        ("id_len", ">i4"),
+        ("id", "V16"),
+        ("vector_len", ">i4"),
+        ("dim", ">i2"),
+        ("unused", ">i2"),
+        ("vector", ">f4", (dim,)),
+    ])
+    rows = np.zeros(count, dtype=row_dtype)
+    rows["field_count"] = 2
+    rows["id_len"] = 16
+    rows["id"] = np.frombuffer(
+        b"".join(uuid.UUID(str(article_id)).bytes for article_id in ids), dtype="V16"
+    )
+    rows["vector_len"] = 4 + 4 * dim
+    rows["dim"] = dim
+    rows["vector"] = vectors
+    return _COPY_HEADER + rows.tobytes() + _COPY_TRAILER
+
+
+# Embedded batches allowed to wait for the writer before the embedder blocks
+PIPELINE_DEPTH = 2
+
+
+def _embed_batches(read_cur, embedder, batch_size, batches, errors):
+    """
+    Producer thread: stream article batches off the server-side cursor, embed
+    them, and queue (ids, embeddings) for the writer. Always ends with a None
+    sentinel; any exception is recorded in `errors` for the main thread.
+    """
+    rows_iter = iter(read_cur)
+    try:
+        while True:
+            batch = list(islice(rows_iter, batch_size))
+            if not batch:
+                break
+            ids = [article_id for article_id, _, _ in batch]
+            texts = [title + ". " + content for _, title, content in batch]
+            batches.put((ids, embedder.embed_batch(texts)))
+    except Exception as exc:
+        errors.append(exc)
+    finally:
+        batches.put(None)
+
 
 def main():
     conn = connect_db()
@@ -25,17 +199,14 @@ def main():
     print("=" * 70)
     print()
 
+    use_halfvec = ensure_search_indexes(cur)
+    prepare_embedding_writes(cur)
+
     # Find articles that need re-embedding
     # These are active articles whose content was modified (merged/expanded)
     # We'll re-embed ALL active articles to be safe (takes ~2-3 min for 2,597)
-    cur.execute("""
-        SELECT id, title, content
-        FROM kb_articles
-        WHERE is_active = true
-        ORDER BY id
-    """)
-    articles = cur.fetchall()
-    total = len(articles)
+    cur.execute("SELECT COUNT(*) FROM kb_articles WHERE is_active = true")
+    total = cur.fetchone()[0]
     print(f"Re-generating embeddings for {total} active articles...\n")
 
     # Process in batches
@@ -43,34 +214,60 @@ def main():
     updated = 0
     start = time.time()
 
-    for i in range(0, total, batch_size):
-        batch = articles[i:i + batch_size]
-        ids = [a[0] for a in batch]
-        texts = [f"{a[1]}. {a[2]}" for a in batch]
+    # Stream articles through a server-side cursor so only a few batches of
+    # content are held in memory. Named cursors need a transaction, so they
+    # run on a separate non-autocommit connection, which also keeps each
+    # pipeline thread on its own connection.
+    read_conn = connect_db()
+    read_cur = read_conn.cursor(name="rebuild_stream")
+    read_cur.itersize = batch_size
+    read_cur.execute("""
+        SELECT id, title, content
+        FROM kb_articles
+        WHERE is_active = true
+        ORDER BY id
+    """)
 
-        embeddings = embedder.embed_batch(texts)
+    # Embed the next batch while the previous one is being written
+    batches = queue.Queue(maxsize=PIPELINE_DEPTH)
+    errors = []
+    producer = threading.Thread(
+        target=_embed_batches,
+        args=(read_cur, embedder, batch_size, batches, errors),
+        daemon=True,
+    )
+    producer.start()
 
-        for article_id, embedding in zip(ids, embeddings):
-            embedding_str = "[" + ",".join(f"{x:.6f}" for x in embedding) + "]"
-            cur.execute(
-                "UPDATE kb_articles SET embedding = %s::vector WHERE id = %s",
-                (embedding_str, article_id),
-            )
-            updated += 1
+    while True:
+        item = batches.get()
+        if item is None:
+            break
+        ids, embeddings = item
+
+        write_embedding_batch(cur, ids, embeddings)
+        updated += len(ids)
 
         elapsed = time.time() - start
-        pct = (i + len(batch)) / total * 100
-        print(f"  Progress: {i + len(batch)}/{total} ({pct:.0f}%) — {elapsed:.1f}s elapsed")
+        pct = updated / total * 100
+        print(f"  Progress: {updated}/{total} ({pct:.0f}%) — {elapsed:.1f}s elapsed")
+
+    producer.join()
+    read_cur.close()
+    read_conn.close()
+    if errors:
+        raise errors[0]
 
     elapsed = time.time() - start
     print(f"\n  Embeddings regenerated: {updated} articles in {elapsed:.1f}s")
 
-    # Rebuild HNSW index
-    print("\nRebuilding HNSW index...")
+    # Rebuild HNSW indexes
+    print("\nRebuilding HNSW indexes...")
     start_idx = time.time()
-    cur.execute("REINDEX INDEX kb_articles_embedding_hnsw_idx")
+    hnsw_indexes = HALFVEC_INDEXES if use_halfvec else FULL_PRECISION_HNSW_INDEXES
+    for name in hnsw_indexes:
+        cur.execute(f"REINDEX INDEX {name}")
     idx_time = time.time() - start_idx
-    print(f"  HNSW index rebuilt in {idx_time:.1f}s")
+    print(f"  HNSW indexes rebuilt in {idx_time:.1f}s")
 
     # Verify index health
     cur.execute("""
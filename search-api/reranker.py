@@ -8,9 +8,38 @@ content overriding good retrieval signals.
 """
 
 import re
+import threading
+import numpy as np
 from sentence_transformers import CrossEncoder
 from typing import List
 
+try:
+    import hyperscan
+except ImportError:  # optional; passage cleanup falls back to `re`
+    hyperscan = None
+
+
+def _build_trailer_db():
+    """Compile the trailer markers into one Hyperscan block-mode database."""
+    if hyperscan is None:
+        return None
+    db = hyperscan.Database()
+    db.compile(
+        expressions=[rb"Attachments?:", rb"Related [Aa]rticles?:"],
+        ids=[0, 1],
+        flags=[hyperscan.HS_FLAG_SOM_LEFTMOST, hyperscan.HS_FLAG_SOM_LEFTMOST],
+    )
+    return db
+
+
+_TRAILER_DB = _build_trailer_db()
+# Hyperscan scratch space is not shareable between concurrent scans
+_SCRATCH = threading.local()
+
+
+def _record_start(match_id, start, end, flags, starts):
+    starts.append(start)
+
 
 class Reranker:
     """Re-rank search results using a cross-encoder model."""
@@ -19,17 +48,48 @@ class Reranker:
     RERANK_WEIGHT = 0.15
     FUSION_WEIGHT = 0.85
 
+    # Passages are capped at 512 chars, which fits well inside 256 tokens
+    MAX_LENGTH = 256
+    # Score every candidate pair in one forward pass
+    PREDICT_BATCH_SIZE = 128
+
+    # Passage cleanup pattern when Hyperscan is unavailable
+    _RE_TRAILER = re.compile(r"(?:Attachments?|Related [Aa]rticles?):.*$", re.DOTALL)
+
     def __init__(self, model_name="cross-encoder/ms-marco-MiniLM-L-6-v2"):
-        self.model = CrossEncoder(model_name)
+        import torch
+
+        self.model = CrossEncoder(model_name, max_length=self.MAX_LENGTH)
+        if torch.cuda.is_available():
+            self.model.model.half()
         print(f"Reranker initialized: {model_name}")
 
     def _clean_passage(self, text: str) -> str:
         """Remove noisy content from passage text before scoring."""
+        # Truncate first so the regex passes never scan past the
+        # cross-encoder context window
+        text = text[:512]
         # Remove "Attachments:" sections and similar noise
-        text = re.sub(r"Attachments?:.*$", "", text, flags=re.DOTALL)
-        text = re.sub(r"Related [Aa]rticles?:.*$", "", text, flags=re.DOTALL)
-        text = re.sub(r"\s+", " ", text).strip()
-        return text[:512]  # Cross-encoder context window
+        if _TRAILER_DB is not None:
+            text = self._cut_trailer_hyperscan(text)
+        else:
+            text = self._RE_TRAILER.sub("", text)
+        # Collapse whitespace runs (same character class as \s+) and strip
+        return " ".join(text.split())
+
+    @staticmethod
+    def _cut_trailer_hyperscan(text: str) -> str:
+        """Cut text at the leftmost trailer marker found by one Hyperscan scan."""
+        scratch = getattr(_SCRATCH, "scratch", None)
+        if scratch is None:
+            scratch = _SCRATCH.scratch = hyperscan.Scratch(_TRAILER_DB)
+        data = text.encode("utf-8")
+        starts = []
+        _TRAILER_DB.scan(data, match_event_handler=_record_start, context=starts, scratch=scratch)
+        if not starts:
+            return text
+        # Markers are ASCII, so the cut always lands on a character boundary
+        return data[:min(starts)].decode("utf-8")
 
     def rerank(
         self,
@@ -47,37 +107,39 @@ class Reranker:
             return candidates[:top_k]
 
         # Build clean (query, passage) pairs
-        pairs = []
-        for c in candidates:
-            title = c.get("title", "")
-            preview = c.get("content_preview", "")
-            passage = self._clean_passage(f"{title}. {preview}")
-            pairs.append((query, passage))
+        pairs = [
+            (query, self._clean_passage(c.get("title", "") + ". " + c.get("content_preview", "")))
+            for c in candidates
+        ]
 
         # Score all pairs
-        raw_scores = self.model.predict(pairs)
-
-        # Normalize cross-encoder scores to [0, 1]
-        min_s = min(raw_scores)
-        max_s = max(raw_scores)
-        score_range = max_s - min_s if max_s != min_s else 1.0
-        norm_scores = [(s - min_s) / score_range for s in raw_scores]
-
-        # Normalize fusion scores to [0, 1]
-        fusion_scores = [c.get("fusion_score", 0) for c in candidates]
-        f_min = min(fusion_scores) if fusion_scores else 0
-        f_max = max(fusion_scores) if fusion_scores else 1
-        f_range = f_max - f_min if f_max != f_min else 1.0
-        norm_fusion = [(s - f_min) / f_range for s in fusion_scores]
+        raw = np.asarray(
+            self.model.predict(
+                pairs,
+                batch_size=self.PREDICT_BATCH_SIZE,
+                convert_to_numpy=True,
+                show_progress_bar=False,
+            ),
+            dtype=np.float64,
+        )
+
+        # Normalize cross-encoder and fusion scores to [0, 1]
+        norm_ce = (raw - raw.min()) / (np.ptp(raw) or 1.0)
+        fusion = np.fromiter(
+            (c.get("fusion_score", 0) for c in candidates), dtype=np.float64, count=len(candidates)
+        )
+        norm_fu = (fusion - fusion.min()) / (np.ptp(fusion) or 1.0)
 
         # Blend scores
-        for c, ce_norm, fu_norm, raw in zip(candidates, norm_scores, norm_fusion, raw_scores):
-            blended = self.RERANK_WEIGHT * ce_norm + self.FUSION_WEIGHT * fu_norm
-            c["rerank_score"] = float(raw)
-            c["fusion_score"] = float(blended)  # Replace fusion with blended
-
-        reranked = sorted(candidates, key=lambda x: x["fusion_score"], reverse=True)
-        return reranked[:top_k]
+        blended = self.RERANK_WEIGHT * norm_ce + self.FUSION_WEIGHT * norm_fu
+        for c, raw_score, blended_score in zip(candidates, raw.tolist(), blended.tolist()):
+            c["rerank_score"] = raw_score
+            c["fusion_score"] = blended_score  # Replace fusion with blended
+
+        # Stable sort keeps input order on ties, like sorted(reverse=True)
+        order = np.argsort(-blended, kind="stable")[:top_k]
+        reranked = [candidates[i] for i in order.tolist()]
+        return reranked
 
 
 if __name__ == "__main__":
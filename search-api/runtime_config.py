@@ -5,12 +5,24 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 import os
+import tempfile
 from typing import Mapping
 
 DEFAULT_API_KEY = "dev-key-change-in-production"
 DEFAULT_API_PORT = 3000
 DEFAULT_RATE_LIMIT_STORAGE_URI = "memory://"
 
+# Config parsed from os.environ on first use; the process environment does
+# not change while the API is running
+_CACHED_CONFIG: "RuntimeConfig | None" = None
+
+# Held backend-check lock files, kept open for the life of the process
+_BACKEND_CHECK_LOCKS: list = []
+
+# Redis connection pools for backend checks, keyed by storage URI, so
+# repeated readiness checks reuse a TCP connection instead of reconnecting
+_REDIS_POOLS: dict = {}
+
 
 class RuntimeConfigError(ValueError):
     """Raised when runtime configuration is invalid."""
@@ -43,8 +55,25 @@ def _parse_int(value: str, *, key: str) -> int:
 
 
 def load_runtime_config(environ: Mapping[str, str] | None = None) -> RuntimeConfig:
-    env = dict(os.environ if environ is None else environ)
+    """Parse config from `environ`, or return the cached os.environ config."""
+    global _CACHED_CONFIG
+    if environ is not None:
+        return _parse_runtime_config(environ)
+    if _CACHED_CONFIG is None:
+        _CACHED_CONFIG = _parse_runtime_config(os.environ)
+    return _CACHED_CONFIG
+
+
+
+def reload_runtime_config() -> RuntimeConfig:
+    """Drop the cached config and re-read os.environ (for tests and reloads)."""
+    global _CACHED_CONFIG
+    _CACHED_CONFIG = None
+    return load_runtime_config()
 
+
+
+def _parse_runtime_config(env: Mapping[str, str]) -> RuntimeConfig:
     environment = env.get("ENVIRONMENT", "development")
     api_key = env.get("ASSISTSUPPORT_API_KEY", DEFAULT_API_KEY)
     api_port = _parse_int(env.get("ASSISTSUPPORT_API_PORT", str(DEFAULT_API_PORT)), key="ASSISTSUPPORT_API_PORT")
@@ -96,13 +125,7 @@ def validate_runtime_config(
 
     if check_backends and config.rate_limit_storage_uri.startswith("redis://"):
         try:
-            import redis  # type: ignore
-
-            client = redis.Redis.from_url(
-                config.rate_limit_storage_uri,
-                socket_connect_timeout=2,
-                socket_timeout=2,
-            )
+            client = _redis_client(config.rate_limit_storage_uri)
             client.ping()
         except Exception as exc:  # pragma: no cover - exercised in integration/smoke
             errors.append(f"Could not connect to rate-limit backend: {exc}")
@@ -111,6 +134,50 @@ def validate_runtime_config(
 
 
 
+def _redis_client(uri: str):
+    """Return a Redis client on the shared pool for `uri`."""
+    import redis  # type: ignore
+
+    pool = _REDIS_POOLS.get(uri)
+    if pool is None:
+        pool = redis.ConnectionPool.from_url(
+            uri,
+            socket_connect_timeout=2,
+            socket_timeout=2,
+            max_connections=4,
+        )
+        _REDIS_POOLS[uri] = pool
+    return redis.Redis(connection_pool=pool)
+
+
+
+def claim_backend_check(lock_dir: str | None = None) -> bool:
+    """
+    True for the first server worker to ask; its siblings (same parent
+    process) get False and can skip the backend round trip at startup.
+
+    The winner holds a non-blocking flock for its lifetime, so a replacement
+    worker re-checks if it dies. Without fcntl (non-POSIX), every worker checks.
+    """
+    try:
+        import fcntl
+    except ImportError:  # pragma: no cover - non-POSIX
+        return True
+
+    path = os.path.join(
+        lock_dir or tempfile.gettempdir(), f"assistsupport-validate-{os.getppid()}.lock"
+    )
+    lock_file = open(path, "w")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return False
+    _BACKEND_CHECK_LOCKS.append(lock_file)
+    return True
+
+
+
 def ensure_valid_runtime_config(
     config: RuntimeConfig,
     *,
@@ -6,18 +6,33 @@ Implements: Reciprocal Rank Fusion (RRF) + weighted combination
 """
 
 import math
-from typing import List, Dict, Tuple
+from collections import defaultdict
+from typing import Hashable, List, Dict, Tuple
+
+import numpy as np
+
+# kb_articles ids arrive as uuid.UUID from the search engine; the fusion
+# strategies only hash and compare them, so any hashable key works
+ArticleId = Hashable
 
 
 class ScoreFusion:
     """Hybrid search score fusion strategies"""
 
+    # Per-intent blend weights for adaptive_fusion
+    ADAPTIVE_WEIGHTS = {
+        "policy": {"bm25": 0.35, "vector": 0.65},
+        "procedure": {"bm25": 0.40, "vector": 0.60},
+        "reference": {"bm25": 0.20, "vector": 0.80},
+        "unknown": {"bm25": 0.30, "vector": 0.70},
+    }
+
     @staticmethod
     def reciprocal_rank_fusion(
-        bm25_results: List[Tuple[str, float]],
-        vector_results: List[Tuple[str, float]],
+        bm25_results: List[Tuple[ArticleId, float]],
+        vector_results: List[Tuple[ArticleId, float]],
         k: int = 60,
-    ) -> List[Tuple[str, float]]:
+    ) -> List[Tuple[ArticleId, float]]:
         """
         Reciprocal Rank Fusion (RRF)
         Score(d) = sum 1/(k + rank(d))
@@ -29,69 +44,86 @@ class ScoreFusion:
 
         Reference: https://arxiv.org/abs/1809.01852
         """
-        scores = {}
+        scores = defaultdict(float)
+        # 1/(k + rank) for every rank either list can reach
+        rrf = [1.0 / (k + rank) for rank in range(1, max(len(bm25_results), len(vector_results)) + 1)]
 
-        for rank, (article_id, _) in enumerate(bm25_results, 1):
-            rrf_score = 1.0 / (k + rank)
-            scores[article_id] = scores.get(article_id, 0) + rrf_score
+        for (article_id, _), rrf_score in zip(bm25_results, rrf):
+            scores[article_id] += rrf_score
 
-        for rank, (article_id, _) in enumerate(vector_results, 1):
-            rrf_score = 1.0 / (k + rank)
-            scores[article_id] = scores.get(article_id, 0) + rrf_score
+        for (article_id, _), rrf_score in zip(vector_results, rrf):
+            scores[article_id] += rrf_score
 
         ranked = sorted(scores.items(), key=lambda x: x[1], reverse=True)
         return ranked
 
     @staticmethod
     def weighted_combination(
-        bm25_results: List[Tuple[str, float]],
-        vector_results: List[Tuple[str, float]],
+        bm25_results: List[Tuple[ArticleId, float]],
+        vector_results: List[Tuple[ArticleId, float]],
         bm25_weight: float = 0.3,
         vector_weight: float = 0.6,
-    ) -> List[Tuple[str, float]]:
+    ) -> List[Tuple[ArticleId, float]]:
         """
         Weighted Combination of BM25 and vector scores.
         Score(d) = bm25_weight * norm(bm25) + vector_weight * norm(vector)
 
         All scores normalized to [0, 1]
         """
-        if not bm25_results:
-            bm25_max = 1.0
-            bm25_dict = {}
-        else:
-            bm25_max = max(s for _, s in bm25_results) if bm25_results else 1.0
-            bm25_dict = {
-                article_id: max(0.0, min(1.0, score / max(bm25_max, 0.01)))
-                for article_id, score in bm25_results
-            }
-
-        if not vector_results:
-            vector_dict = {}
-        else:
-            vector_dict = {
-                article_id: min(1.0, max(0.0, score))
-                for article_id, score in vector_results
-            }
-
-        all_ids = set(bm25_dict.keys()) | set(vector_dict.keys())
-        combined = {}
-
-        for article_id in all_ids:
-            bm25_norm = bm25_dict.get(article_id, 0.0)
-            vector_norm = vector_dict.get(article_id, 0.0)
-
-            score = (bm25_weight * bm25_norm) + (vector_weight * vector_norm)
-            combined[article_id] = score
-
-        ranked = sorted(combined.items(), key=lambda x: x[1], reverse=True)
-        return ranked
+        return ScoreFusion.blend(
+            ScoreFusion.normalize(bm25_results, vector_results),
+            bm25_weight,
+            vector_weight,
+        )
+
+    @staticmethod
+    def normalize(
+        bm25_results: List[Tuple[ArticleId, float]],
+        vector_results: List[Tuple[ArticleId, float]],
+    ) -> Tuple[List[ArticleId], np.ndarray, np.ndarray]:
+        """
+        Align BM25 and vector scores on one id list, each normalized to [0, 1].
+        BM25 is scaled by its max score, vector scores are clamped.
+        Returns (ids, bm25_norm, vector_norm); missing scores are 0.0.
+        """
+        bm25_max = max((s for _, s in bm25_results), default=1.0)
+        bm25_dict = {
+            article_id: max(0.0, min(1.0, score / max(bm25_max, 0.01)))
+            for article_id, score in bm25_results
+        }
+        vector_dict = {
+            article_id: min(1.0, max(0.0, score))
+            for article_id, score in vector_results
+        }
+
+        ids = list(bm25_dict)
+        ids.extend(article_id for article_id in vector_dict if article_id not in bm25_dict)
+        bm25_norm = np.fromiter(
+            (bm25_dict.get(i, 0.0) for i in ids), dtype=np.float64, count=len(ids)
+        )
+        vector_norm = np.fromiter(
+            (vector_dict.get(i, 0.0) for i in ids), dtype=np.float64, count=len(ids)
+        )
+        return ids, bm25_norm, vector_norm
+
+    @staticmethod
+    def blend(
+        normalized: Tuple[List[ArticleId], np.ndarray, np.ndarray],
+        bm25_weight: float,
+        vector_weight: float,
+    ) -> List[Tuple[ArticleId, float]]:
+        """Rank the output of normalize() by the weighted sum of its scores."""
+        ids, bm25_norm, vector_norm = normalized
+        score = bm25_weight * bm25_norm + vector_weight * vector_norm
+        order = np.argsort(-score, kind="stable")
+        return [(ids[i], s) for i, s in zip(order.tolist(), score[order].tolist())]
 
     @staticmethod
     def adaptive_fusion(
-        bm25_results: List[Tuple[str, float]],
-        vector_results: List[Tuple[str, float]],
+        bm25_results: List[Tuple[ArticleId, float]],
+        vector_results: List[Tuple[ArticleId, float]],
         query_type: str,
-    ) -> List[Tuple[str, float]]:
+    ) -> List[Tuple[ArticleId, float]]:
         """
         Adaptive Fusion Based on Query Intent
 
@@ -101,20 +133,12 @@ class ScoreFusion:
         - Reference: boost vector (semantic understanding critical)
         - Unknown: balanced with slight vector preference
         """
-        weights = {
-            "policy": {"bm25": 0.35, "vector": 0.65},
-            "procedure": {"bm25": 0.40, "vector": 0.60},
-            "reference": {"bm25": 0.20, "vector": 0.80},
-            "unknown": {"bm25": 0.30, "vector": 0.70},
-        }
-
-        w = weights.get(query_type, weights["unknown"])
+        w = ScoreFusion.ADAPTIVE_WEIGHTS.get(query_type, ScoreFusion.ADAPTIVE_WEIGHTS["unknown"])
 
-        return ScoreFusion.weighted_combination(
-            bm25_results,
-            vector_results,
-            bm25_weight=w["bm25"],
-            vector_weight=w["vector"],
+        return ScoreFusion.blend(
+            ScoreFusion.normalize(bm25_results, vector_results),
+            w["bm25"],
+            w["vector"],
         )
 
 
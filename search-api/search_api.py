@@ -4,71 +4,312 @@ Production Search API for AssistSupport
 Hybrid search endpoint with authentication, rate limiting, and monitoring
 """
 
+import atexit
+import hashlib
+import hmac
+import logging
+import logging.handlers
 import sys
 import os
+import queue
+import threading
+import time
+from collections import OrderedDict
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from flask import Flask, request, jsonify
+import orjson
+from flask import Flask, request
+from flask.json.provider import DefaultJSONProvider
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
-from functools import wraps
+from functools import lru_cache, wraps
 from datetime import datetime, timezone
+
+try:
+    from flask_compress import Compress
+except ImportError:  # optional; responses are sent uncompressed without it
+    Compress = None
+
 from runtime_config import (
     DEFAULT_API_KEY,
     load_runtime_config,
+    reload_runtime_config,
     ensure_valid_runtime_config,
 )
 
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Enqueue records unformatted so message and traceback formatting run in
+    the listener thread (the queue is in-process, so nothing is pickled)."""
+
+    def prepare(self, record):
+        return record
+
+
+# Request threads only enqueue log records; a QueueListener thread formats
+# and writes them, so error bursts don't serialize requests on stderr
+logger = logging.getLogger("search_api")
+logger.setLevel(logging.INFO)
+logger.propagate = False
+_log_queue = queue.SimpleQueue()
+logger.addHandler(_DeferredQueueHandler(_log_queue))
+_log_output = logging.StreamHandler()
+_log_output.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+_log_listener = logging.handlers.QueueListener(_log_queue, _log_output)
+_log_listener.start()
+atexit.register(_log_listener.stop)
+
 # Initialize Flask app
 app = Flask(__name__)
 app.config["JSON_SORT_KEYS"] = False
+# Request bodies are small JSON objects; anything larger is refused before
+# it is read or parsed (Werkzeug also stops reading streams past this size)
+MAX_REQUEST_BYTES = 64 * 1024
+app.config["MAX_CONTENT_LENGTH"] = MAX_REQUEST_BYTES
 
 # Configuration
 _RUNTIME_CONFIG = load_runtime_config()
 API_KEY = _RUNTIME_CONFIG.api_key
 API_PORT = _RUNTIME_CONFIG.api_port
 RATE_LIMIT_STORAGE_URI = _RUNTIME_CONFIG.rate_limit_storage_uri
+# ENVIRONMENT is fixed for the process, so resolve it once, not per request
+_IS_PROD = _RUNTIME_CONFIG.is_production
 
-# Rate limiting: 100 requests per minute per IP
+# Rate limiting: 100 requests per minute per IP. The sliding-window counter
+# keeps two counters per key (no per-hit log like moving-window), and the
+# Redis storage applies each hit with one registered Lua script call.
+RATE_LIMIT_STRATEGY = "sliding-window-counter"
 limiter = Limiter(
     app=app,
     key_func=get_remote_address,
     default_limits=["100 per minute"],
     storage_uri=RATE_LIMIT_STORAGE_URI,
+    strategy=RATE_LIMIT_STRATEGY,
+)
+
+# Compression is opt-in per view (see _compressed) so tiny bodies like /health
+# and /config skip it. Brotli level 4 keeps CPU bounded next to orjson.
+app.config.update(
+    COMPRESS_REGISTER=False,
+    COMPRESS_ALGORITHM=["br", "gzip"],
+    COMPRESS_MIN_SIZE=500,
+    COMPRESS_LEVEL=4,
+    COMPRESS_BR_LEVEL=4,
 )
+compress = Compress(app) if Compress is not None else None
+
+
+def _compressed(view):
+    """Compress the view's response when flask-compress is installed."""
+    if compress is None:
+        return view
+    return compress.compressed()(view)
+
 
-# Global search engine instance (initialized on first request)
-_engine = None
+# Engine scores may be numpy floats; orjson serializes them natively
+_ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NAIVE_UTC
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """app.json backed by orjson, so jsonify, request.get_json and extension
+    responses share the options used by _json_response."""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, option=_ORJSON_OPTIONS).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, option=_ORJSON_OPTIONS), mimetype=self.mimetype
+        )
+
+
+app.json = OrjsonProvider(app)
+
+
+def _json_response(payload, status=200):
+    """Serialize payload with orjson into a JSON response."""
+    return app.response_class(
+        orjson.dumps(payload, option=_ORJSON_OPTIONS),
+        status=status,
+        mimetype="application/json",
+    )
+
+
+# (epoch second, ISO-8601 string) for the last timestamp handed out
+_ts_cache = (0, "")
+
+
+def _now_iso() -> str:
+    """Current UTC time as ISO-8601, formatted at most once per second."""
+    global _ts_cache
+    now = int(time.time())
+    cached_at, iso = _ts_cache
+    if now != cached_at:
+        iso = datetime.fromtimestamp(now, timezone.utc).isoformat()
+        _ts_cache = (now, iso)
+    return iso
+
+
+# Encoded /search results arrays by (query, top_k, include_scores, fusion_strategy).
+# An entry is reused only while the engine returns the very same cached
+# results list, so it goes stale exactly when the engine's result cache does.
+FORMAT_CACHE_SIZE = 4096
+_format_cache = OrderedDict()
+_format_cache_lock = threading.Lock()
+
+
+def _format_results(results, include_scores):
+    """Shape engine results into /search response rows."""
+    formatted_results = [
+        {
+            "rank": i,
+            "article_id": r["article_id"],
+            "title": r["title"],
+            "category": r["category"],
+            "preview": r["content_preview"],
+            "source_document": r.get("source_document_id"),
+            "section": r.get("heading_path"),
+        }
+        for i, r in enumerate(results, 1)
+    ]
+
+    if include_scores:
+        for res, r in zip(formatted_results, results):
+            res["scores"] = {
+                "bm25": r["bm25_score"],
+                "vector": r["vector_score"],
+                "fused": r["fusion_score"],
+            }
+
+    return formatted_results
+
+
+def _cached_results_json(key, results, include_scores) -> bytes:
+    """JSON array of _format_results rows, reused for this exact results list."""
+    with _format_cache_lock:
+        entry = _format_cache.get(key)
+        if entry is not None and entry[0] is results:
+            _format_cache.move_to_end(key)
+            return entry[1]
+
+    results_json = orjson.dumps(_format_results(results, include_scores), option=_ORJSON_OPTIONS)
+    with _format_cache_lock:
+        _format_cache[key] = (results, results_json)
+        _format_cache.move_to_end(key)
+        if len(_format_cache) > FORMAT_CACHE_SIZE:
+            _format_cache.popitem(last=False)
+    return results_json
+
+
+def _search_response_body(result, results_json: bytes, results_count: int) -> bytes:
+    """
+    Encode the /search success body in its fixed field order. The results
+    array, the bulk of the payload, arrives pre-encoded and is spliced in
+    rather than serialized again.
+    """
+    head = orjson.dumps(
+        {
+            "status": "success",
+            "query": result["query"],
+            "query_id": result.get("query_id"),
+            "intent": result["intent"],
+            "intent_confidence": result["intent_confidence"],
+            "results_count": results_count,
+        },
+        option=_ORJSON_OPTIONS,
+    )
+    metrics = orjson.dumps(
+        {
+            "latency_ms": result["metrics"]["total_time_ms"],
+            "embedding_time_ms": result["metrics"]["embedding_time_ms"],
+            "search_time_ms": result["metrics"]["search_time_ms"],
+            "rerank_time_ms": result["metrics"].get("rerank_time_ms", 0),
+            "result_count": results_count,
+            "timestamp": _now_iso(),
+        },
+        option=_ORJSON_OPTIONS,
+    )
+    return b"".join((head[:-1], b',"results":', results_json, b',"metrics":', metrics, b"}"))
+
+
+def _request_json():
+    """Parse a JSON object request body with orjson; None if missing, malformed
+    or not an object, so handlers can use data.get() without re-checking."""
+    if not request.is_json:
+        return None
+    body = request.get_data(cache=False)
+    if not body:
+        return None
+    try:
+        data = orjson.loads(body)
+    except orjson.JSONDecodeError:
+        return None
+    return data if isinstance(data, dict) else None
 
 
 def is_production() -> bool:
-    return os.environ.get("ENVIRONMENT", "development").lower() == "production"
+    return _IS_PROD
 
 
+@lru_cache(maxsize=1)
 def _get_engine():
-    """Lazy-initialize the search engine singleton"""
-    global _engine
-    if _engine is None:
-        from hybrid_search import HybridSearchEngine
-
-        _engine = HybridSearchEngine()
-        print("Search engine initialized")
-    return _engine
+    """Search engine singleton, created on first call (entrypoints warm it at startup)"""
+    from hybrid_search import HybridSearchEngine
+
+    engine = HybridSearchEngine()
+    logger.info("Search engine initialized")
+    return engine
+
+
+FEEDBACK_RATINGS = frozenset({"helpful", "not_helpful", "incorrect"})
+
+# Feedback rows are written by one background thread so /feedback does not
+# wait on the INSERT; a full queue is reported to the client as 503
+FEEDBACK_QUEUE_SIZE = 10_000
+_feedback_queue = queue.Queue(maxsize=FEEDBACK_QUEUE_SIZE)
+_feedback_worker = None
+_feedback_worker_lock = threading.Lock()
+
+
+def _drain_feedback():
+    while True:
+        item = _feedback_queue.get()
+        try:
+            _get_engine()._log_feedback(*item)
+        except Exception:
+            logger.exception("Feedback logging error")
+        finally:
+            _feedback_queue.task_done()
+
+
+def _enqueue_feedback(item: tuple):
+    """Queue a feedback row, starting the writer thread on first use."""
+    global _feedback_worker
+    if _feedback_worker is None:
+        with _feedback_worker_lock:
+            if _feedback_worker is None:
+                _feedback_worker = threading.Thread(
+                    target=_drain_feedback, name="feedback-writer", daemon=True
+                )
+                _feedback_worker.start()
+    _feedback_queue.put_nowait(item)
 
 
 def internal_error_response(error: Exception, *, context: str):
     """Return a safe error payload and avoid leaking internals in production."""
-    print(f"{context}: {error}")
+    logger.exception("%s: %s", context, error)
     error_msg = str(error) if not is_production() else "Internal server error"
-    return (
-        jsonify(
-            {
-                "status": "error",
-                "error": error_msg,
-                "timestamp": datetime.now(timezone.utc).isoformat(),
-            }
-        ),
+    return _json_response(
+        {
+            "status": "error",
+            "error": error_msg,
+            "timestamp": _now_iso(),
+        },
         500,
     )
 
@@ -78,49 +319,55 @@ def require_api_key(f):
 
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        if is_production() and API_KEY == DEFAULT_API_KEY:
-            return (
-                jsonify(
-                    {
-                        "error": "Server is misconfigured: ASSISTSUPPORT_API_KEY must be set in production"
-                    }
-                ),
+        if not _IS_PROD:
+            return f(*args, **kwargs)
+
+        if API_KEY == DEFAULT_API_KEY:
+            return _json_response(
+                {
+                    "error": "Server is misconfigured: ASSISTSUPPORT_API_KEY must be set in production"
+                },
                 500,
             )
 
-        if is_production():
-            auth_header = request.headers.get("Authorization", "")
-            if not auth_header.startswith("Bearer "):
-                return (
-                    jsonify({"error": "Missing or invalid Authorization header"}),
-                    401,
-                )
+        auth_header = request.headers.get("Authorization", "")
+        if not auth_header.startswith("Bearer "):
+            return _json_response({"error": "Missing or invalid Authorization header"}, 401)
 
-            token = auth_header.split(" ", 1)[1]
-            if token != API_KEY:
-                return jsonify({"error": "Invalid API key"}), 403
+        token = auth_header.split(" ", 1)[1]
+        if not hmac.compare_digest(token.encode(), API_KEY.encode()):
+            return _json_response({"error": "Invalid API key"}, 403)
 
         return f(*args, **kwargs)
 
     return decorated_function
 
 
+_health_cache = (0, b"")
+
+
 @app.route("/health", methods=["GET"])
 def health():
     """Health check endpoint"""
-    return (
-        jsonify(
+    # Load balancers poll this constantly; only the timestamp changes, so the
+    # body is serialized at most once per second and shared between calls
+    global _health_cache
+    now = int(time.time())
+    cached_at, body = _health_cache
+    if now != cached_at:
+        body = orjson.dumps(
             {
                 "status": "ok",
-                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "timestamp": _now_iso(),
                 "service": "AssistSupport Hybrid Search API",
             }
-        ),
-        200,
-    )
+        )
+        _health_cache = (now, body)
+    return app.response_class(body, mimetype="application/json")
 
 
 @app.route("/search", methods=["POST"])
+@_compressed
 @limiter.limit("100 per minute")
 @require_api_key
 def search():
@@ -136,30 +383,30 @@ def search():
     }
     """
     try:
-        data = request.get_json(silent=True)
+        data = _request_json()
 
         if not data:
-            return jsonify({"error": "Request body required"}), 400
+            return _json_response({"error": "Request body required"}, 400)
 
         query_raw = data.get("query", "")
         if not isinstance(query_raw, str):
-            return jsonify({"error": "Query must be a string"}), 400
+            return _json_response({"error": "Query must be a string"}, 400)
 
         query = query_raw.strip()
         if not query:
-            return jsonify({"error": "Query parameter required"}), 400
+            return _json_response({"error": "Query parameter required"}, 400)
 
         top_k_raw = data.get("top_k", 10)
         if not isinstance(top_k_raw, int):
-            return jsonify({"error": "top_k must be an integer"}), 400
+            return _json_response({"error": "top_k must be an integer"}, 400)
         if top_k_raw < 1:
-            return jsonify({"error": "top_k must be >= 1"}), 400
+            return _json_response({"error": "top_k must be >= 1"}, 400)
         top_k = min(top_k_raw, 50)
 
         include_scores = bool(data.get("include_scores", False))
         fusion_strategy_raw = data.get("fusion_strategy", "adaptive")
         if not isinstance(fusion_strategy_raw, str):
-            return jsonify({"error": "fusion_strategy must be a string"}), 400
+            return _json_response({"error": "fusion_strategy must be a string"}, 400)
         fusion_strategy = fusion_strategy_raw
 
         engine = _get_engine()
@@ -172,47 +419,17 @@ def search():
             fusion_strategy=fusion_strategy,
         )
 
-        # Format response using the dict-based result structure
-        formatted_results = []
-        for i, r in enumerate(result["results"], 1):
-            res = {
-                "rank": i,
-                "article_id": r["article_id"],
-                "title": r["title"],
-                "category": r["category"],
-                "preview": r["content_preview"],
-                "source_document": r.get("source_document_id"),
-                "section": r.get("heading_path"),
-            }
-
-            if include_scores:
-                res["scores"] = {
-                    "bm25": round(r["bm25_score"], 3),
-                    "vector": round(r["vector_score"], 3),
-                    "fused": round(r["fusion_score"], 3),
-                }
-
-            formatted_results.append(res)
-
-        response = {
-            "status": "success",
-            "query": result["query"],
-            "query_id": result.get("query_id"),
-            "intent": result["intent"],
-            "intent_confidence": round(result["intent_confidence"], 2),
-            "results_count": len(formatted_results),
-            "results": formatted_results,
-            "metrics": {
-                "latency_ms": round(result["metrics"]["total_time_ms"], 1),
-                "embedding_time_ms": round(result["metrics"]["embedding_time_ms"], 1),
-                "search_time_ms": round(result["metrics"]["search_time_ms"], 1),
-                "rerank_time_ms": round(result["metrics"].get("rerank_time_ms", 0), 1),
-                "result_count": len(formatted_results),
-                "timestamp": datetime.now(timezone.utc).isoformat(),
-            },
-        }
+        results = result["results"]
+        results_json = _cached_results_json(
+            (query.lower(), top_k, include_scores, fusion_strategy),
+            results,
+            include_scores,
+        )
 
-        return jsonify(response), 200
+        return app.response_class(
+            _search_response_body(result, results_json, len(results)),
+            mimetype="application/json",
+        )
 
     except Exception as e:
         return internal_error_response(e, context="Search error")
@@ -234,10 +451,10 @@ def submit_feedback():
     }
     """
     try:
-        data = request.get_json(silent=True)
+        data = _request_json()
 
         if not data:
-            return jsonify({"error": "Request body required"}), 400
+            return _json_response({"error": "Request body required"}, 400)
 
         query_id = data.get("query_id")
         result_rank = data.get("result_rank")
@@ -245,43 +462,40 @@ def submit_feedback():
         comment = data.get("comment", "")
         article_id = data.get("article_id")
 
-        if not all([query_id, result_rank is not None, rating]):
-            return (
-                jsonify({"error": "query_id, result_rank, and rating required"}),
-                400,
-            )
+        if not (query_id and result_rank is not None and rating):
+            return _json_response({"error": "query_id, result_rank, and rating required"}, 400)
 
         if not isinstance(query_id, str) or not query_id.strip():
-            return jsonify({"error": "query_id must be a non-empty string"}), 400
+            return _json_response({"error": "query_id must be a non-empty string"}, 400)
 
         if not isinstance(result_rank, int) or result_rank < 1:
-            return jsonify({"error": "result_rank must be a positive integer"}), 400
+            return _json_response({"error": "result_rank must be a positive integer"}, 400)
 
         if not isinstance(rating, str):
-            return jsonify({"error": "rating must be a string"}), 400
+            return _json_response({"error": "rating must be a string"}, 400)
 
         if comment is None:
             comment = ""
         if not isinstance(comment, str):
-            return jsonify({"error": "comment must be a string"}), 400
+            return _json_response({"error": "comment must be a string"}, 400)
 
         if article_id is not None and not isinstance(article_id, str):
-            return jsonify({"error": "article_id must be a string"}), 400
+            return _json_response({"error": "article_id must be a string"}, 400)
 
-        if rating not in ("helpful", "not_helpful", "incorrect"):
-            return jsonify({"error": f"Invalid rating: {rating}"}), 400
+        if rating not in FEEDBACK_RATINGS:
+            return _json_response({"error": f"Invalid rating: {rating}"}, 400)
 
-        engine = _get_engine()
-        engine._log_feedback(query_id, result_rank, rating, comment, article_id)
+        try:
+            _enqueue_feedback((query_id, result_rank, rating, comment, article_id))
+        except queue.Full:
+            return _json_response({"error": "Feedback queue is full, retry later"}, 503)
 
-        return (
-            jsonify(
-                {
-                    "status": "success",
-                    "message": "Feedback recorded",
-                    "timestamp": datetime.now(timezone.utc).isoformat(),
-                }
-            ),
+        return _json_response(
+            {
+                "status": "success",
+                "message": "Feedback recorded",
+                "timestamp": _now_iso(),
+            },
             200,
         )
 
@@ -297,53 +511,74 @@ def stats():
         engine = _get_engine()
         data = engine._get_stats()
 
-        return (
-            jsonify(
-                {
-                    "status": "success",
-                    "data": data,
-                    "timestamp": datetime.now(timezone.utc).isoformat(),
-                }
-            ),
+        response = _json_response(
+            {
+                "status": "success",
+                "data": data,
+                "timestamp": _now_iso(),
+            },
             200,
         )
+        # The ETag covers the stats only, not the per-response timestamp
+        response.set_etag(hashlib.md5(orjson.dumps(data, option=_ORJSON_OPTIONS)).hexdigest())
+        response.cache_control.private = True
+        response.cache_control.max_age = 60
+        return response.make_conditional(request)
 
     except Exception as e:
         return internal_error_response(e, context="Stats error")
 
 
+# /config is static for the life of the process: serialize it once
+_CONFIG_BODY = orjson.dumps(
+    {
+        "api_url": f"http://localhost:{API_PORT}",
+        "version": "1.0.0",
+        "features": {
+            "hybrid_search": True,
+            "intent_detection": True,
+            "feedback_collection": True,
+        },
+    }
+)
+_CONFIG_ETAG = hashlib.md5(_CONFIG_BODY).hexdigest()
+
+
 @app.route("/config", methods=["GET"])
 def config():
     """Configuration endpoint (no auth required)"""
-    return (
-        jsonify(
-            {
-                "api_url": f"http://localhost:{API_PORT}",
-                "version": "1.0.0",
-                "features": {
-                    "hybrid_search": True,
-                    "intent_detection": True,
-                    "feedback_collection": True,
-                },
-            }
-        ),
-        200,
-    )
+    response = app.response_class(_CONFIG_BODY, status=200, mimetype="application/json")
+    response.set_etag(_CONFIG_ETAG)
+    response.cache_control.public = True
+    response.cache_control.max_age = 3600
+    return response.make_conditional(request)
+
+
+@app.before_request
+def reject_oversized_body():
+    if request.content_length is not None and request.content_length > MAX_REQUEST_BYTES:
+        return request_too_large(None)
+
+
+@app.errorhandler(413)
+def request_too_large(e):
+    return _json_response({"error": f"Request body exceeds {MAX_REQUEST_BYTES} bytes"}, 413)
 
 
 @app.errorhandler(429)
 def ratelimit_handler(e):
-    return jsonify({"error": "Rate limit exceeded", "message": str(e.description)}), 429
+    return _json_response({"error": "Rate limit exceeded", "message": str(e.description)}, 429)
 
 
 @app.errorhandler(404)
 def not_found(e):
-    return jsonify({"error": "Endpoint not found", "path": request.path}), 404
+    return _json_response({"error": "Endpoint not found", "path": request.path}, 404)
 
 
 def run_server():
     """Start the API server"""
-    runtime_config = load_runtime_config()
+    # Re-read the environment so startup validation sees the final values
+    runtime_config = reload_runtime_config()
     ensure_valid_runtime_config(runtime_config, check_backends=True)
 
     print(f"Starting AssistSupport Search API on port {runtime_config.api_port}")
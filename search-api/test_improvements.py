@@ -3,9 +3,17 @@
 
 import requests
 import json
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
 
 API_URL = "http://localhost:3000/search"
 
+# One keep-alive session shared by every request; the pool is sized for the
+# concurrent smoke queries so none of them opens a throwaway connection
+SESSION = requests.Session()
+SESSION.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=20, max_retries=0))
+SESSION.headers.update({"Connection": "keep-alive", "Accept-Encoding": "gzip, br"})
+
 TEST_CASES = [
     ("Can I use a flash drive?", "flash", "POLICY"),
     ("How do I reset my password?", "password", None),
@@ -27,14 +35,25 @@ print()
 passed = 0
 total = len(TEST_CASES)
 
-for i, (query, expected_keyword, expected_category) in enumerate(TEST_CASES, 1):
+
+def run_query(query):
+    resp = SESSION.post(
+        API_URL,
+        json={"query": query, "top_k": 3, "include_scores": True},
+        timeout=10,
+    )
+    return resp.json()
+
+
+# Queries are independent, so send them all at once and report in order
+with ThreadPoolExecutor(max_workers=len(TEST_CASES)) as executor:
+    futures = [executor.submit(run_query, query) for query, _, _ in TEST_CASES]
+
+for i, ((query, expected_keyword, expected_category), future) in enumerate(
+    zip(TEST_CASES, futures), 1
+):
     try:
-        resp = requests.post(
-            API_URL,
-            json={"query": query, "top_k": 3, "include_scores": True},
-            timeout=10,
-        )
-        data = resp.json()
+        data = future.result()
 
         intent = data.get("intent", "N/A")
         conf = data.get("intent_confidence", 0)
@@ -55,14 +74,16 @@ for i, (query, expected_keyword, expected_category) in enumerate(TEST_CASES, 1):
 
         # Check if top result matches expected
         if results:
-            top_title = results[0].get("title", "").lower()
+            keyword = expected_keyword.lower()
+            # Lowercase each top-3 title/preview once for all keyword checks
+            top3 = [
+                (r.get("title", "").lower(), r.get("preview", "").lower())
+                for r in results[:3]
+            ]
+            top_title, top_preview = top3[0]
             top_cat = results[0].get("category", "")
-            top_preview = results[0].get("preview", "").lower()
 
-            keyword_match = (
-                expected_keyword.lower() in top_title
-                or expected_keyword.lower() in top_preview
-            )
+            keyword_match = keyword in top_title or keyword in top_preview
             category_match = (
                 expected_category is None or top_cat == expected_category
             )
@@ -73,9 +94,8 @@ for i, (query, expected_keyword, expected_category) in enumerate(TEST_CASES, 1):
             else:
                 # Check top-3 for partial credit
                 top3_match = any(
-                    expected_keyword.lower() in r.get("title", "").lower()
-                    or expected_keyword.lower() in r.get("preview", "").lower()
-                    for r in results[:3]
+                    keyword in title or keyword in preview
+                    for title, preview in top3
                 )
                 if top3_match:
                     print(f"  >>> MISS (top-1), but found in top-3")
@@ -99,7 +119,7 @@ print("\nCRITICAL FIX VERIFICATION:")
 print("-" * 40)
 
 # Test 1: Flash drive policy
-resp = requests.post(API_URL, json={"query": "Can I use a flash drive?", "top_k": 1, "include_scores": True})
+resp = SESSION.post(API_URL, json={"query": "Can I use a flash drive?", "top_k": 1, "include_scores": True})
 data = resp.json()
 r = data["results"][0] if data["results"] else {}
 is_flash = "flash" in r.get("title", "").lower()
@@ -112,7 +132,7 @@ print(f"  Policy boost bug fixed: {'YES' if fused != 0.6 else 'MAYBE'}")
 
 # Test 2: Score inflation gone
 print()
-resp = requests.post(API_URL, json={"query": "VPN setup instructions", "top_k": 1, "include_scores": True})
+resp = SESSION.post(API_URL, json={"query": "VPN setup instructions", "top_k": 1, "include_scores": True})
 data = resp.json()
 r = data["results"][0] if data["results"] else {}
 title = r.get("title", "")
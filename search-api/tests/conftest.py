@@ -0,0 +1,48 @@
+import importlib.util
+import sys
+import types
+from pathlib import Path
+
+import pytest
+
+
+SEARCH_API_DIR = Path(__file__).resolve().parents[1]
+if str(SEARCH_API_DIR) not in sys.path:
+    sys.path.insert(0, str(SEARCH_API_DIR))
+
+
+def _placeholder_module(name, attrs):
+    module = types.ModuleType(name)
+    for attr in attrs:
+        setattr(module, attr, type(f"_Placeholder{attr}", (), {}))
+    return module
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _stub_heavy_modules():
+    """
+    Install placeholder modules once per session, undone at the end:
+    - sentence_transformers when it isn't installed, so embedding_service,
+      reranker and hybrid_search import without the model package;
+    - intent_detection, so nothing that resolves it lazily loads the
+      trained model.
+    Modules already imported are left alone. Test modules whose subject
+    needs a stubbed package import it from a fixture, not at collection.
+    """
+    with pytest.MonkeyPatch.context() as mp:
+        if (
+            "sentence_transformers" not in sys.modules
+            and importlib.util.find_spec("sentence_transformers") is None
+        ):
+            mp.setitem(
+                sys.modules,
+                "sentence_transformers",
+                _placeholder_module("sentence_transformers", ("CrossEncoder", "SentenceTransformer")),
+            )
+        if "intent_detection" not in sys.modules:
+            mp.setitem(
+                sys.modules,
+                "intent_detection",
+                _placeholder_module("intent_detection", ("IntentDetector",)),
+            )
+        yield
@@ -0,0 +1,54 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+SEARCH_API_DIR = Path(__file__).resolve().parents[1]
+if str(SEARCH_API_DIR) not in sys.path:
+    sys.path.insert(0, str(SEARCH_API_DIR))
+
+import db_config  # noqa: E402
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = 0
+        self.rolled_back = False
+
+    def rollback(self):
+        self.rolled_back = True
+
+
+class FakePool:
+    def __init__(self):
+        self.conn = FakeConnection()
+        self.returned = []
+
+    def getconn(self):
+        return self.conn
+
+    def putconn(self, conn, close=False):
+        self.returned.append((conn, close))
+
+
+def test_db_conn_returns_connection_to_pool(monkeypatch):
+    pool = FakePool()
+    monkeypatch.setattr(db_config, "_POOL", pool)
+
+    with db_config.db_conn() as conn:
+        assert conn is pool.conn
+
+    assert pool.returned == [(pool.conn, False)]
+    assert pool.conn.rolled_back is False
+
+
+def test_db_conn_rolls_back_and_returns_on_error(monkeypatch):
+    pool = FakePool()
+    monkeypatch.setattr(db_config, "_POOL", pool)
+
+    with pytest.raises(RuntimeError):
+        with db_config.db_conn():
+            raise RuntimeError("boom")
+
+    assert pool.conn.rolled_back is True
+    assert pool.returned == [(pool.conn, False)]
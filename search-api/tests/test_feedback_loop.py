@@ -7,7 +7,7 @@ SEARCH_API_DIR = Path(__file__).resolve().parents[1]
 if str(SEARCH_API_DIR) not in sys.path:
     sys.path.insert(0, str(SEARCH_API_DIR))
 
-from feedback_loop import compute_quality_scores, get_quality_scores  # noqa: E402
+from feedback_loop import compute_quality_scores, install_quality_trigger  # noqa: E402
 
 
 class FakeCursor:
@@ -40,49 +40,38 @@ class FakeConnection:
         self.committed = True
 
 
-def test_compute_quality_scores_updates_only_articles_with_enough_feedback():
-    # article-1 has 4 ratings (eligible), article-2 has 2 ratings (ignored)
-    cursor = FakeCursor(
-        [
-            [
-                ("article-1", "helpful", 3),
-                ("article-1", "incorrect", 1),
-                ("article-2", "helpful", 2),
-            ]
-        ]
-    )
+def test_compute_quality_scores_runs_single_aggregate_update():
+    cursor = FakeCursor([])
+    cursor.rowcount = 7
     conn = FakeConnection(cursor)
 
     updated = compute_quality_scores(conn)
 
-    assert updated == 1
+    assert updated == 7
     assert conn.committed is True
-    updates = [entry for entry in cursor.executed if entry[0].startswith("UPDATE kb_articles")]
-    assert len(updates) == 1
-    score, article_id = updates[0][1]
-    assert article_id == "article-1"
-    assert score == pytest.approx(1.01, abs=1e-6)
+    assert len(cursor.executed) == 1
+    sql, params = cursor.executed[0]
+    assert sql.startswith("WITH agg AS")
+    assert "UPDATE kb_articles" in sql
+    assert "HAVING COUNT(*) >= %(min_feedback)s" in sql
+    assert params["min_feedback"] == 3
+    assert params["incorrect"] == pytest.approx(-0.5)
     assert cursor.closed is True
 
 
-def test_get_quality_scores_defaults_null_values_to_one():
-    cursor = FakeCursor(
-        [
-            [
-                ("article-1", 1.3),
-                ("article-2", None),
-            ]
-        ]
-    )
+def test_install_quality_trigger_embeds_score_constants():
+    cursor = FakeCursor([])
     conn = FakeConnection(cursor)
 
-    scores = get_quality_scores(conn, ["article-1", "article-2"])
-    assert scores["article-1"] == pytest.approx(1.3)
-    assert scores["article-2"] == pytest.approx(1.0)
-    assert cursor.closed is True
-
+    install_quality_trigger(conn)
 
-def test_get_quality_scores_returns_empty_for_empty_input():
-    cursor = FakeCursor([])
-    conn = FakeConnection(cursor)
-    assert get_quality_scores(conn, []) == {}
+    assert conn.committed is True
+    assert len(cursor.executed) == 1
+    sql, params = cursor.executed[0]
+    assert params is None
+    assert "AFTER INSERT ON search_feedback" in sql
+    assert "HAVING COUNT(*) >= 3" in sql
+    assert "WHEN 'incorrect' THEN -0.5" in sql
+    assert "LEAST(0.3, agg.total * 0.02)" in sql
+    assert "{" not in sql
+    assert cursor.closed is True
@@ -0,0 +1,129 @@
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+
+SEARCH_API_DIR = Path(__file__).resolve().parents[1]
+if str(SEARCH_API_DIR) not in sys.path:
+    sys.path.insert(0, str(SEARCH_API_DIR))
+
+
+@pytest.fixture(scope="module")
+def hybrid_search():
+    # Imported once conftest has stubbed the model packages
+    import hybrid_search
+
+    return hybrid_search
+
+
+def _article(article_id, category, source_document_id, quality_score=1.0):
+    # Column order of ARTICLE_SQL plus quality, BM25 and vector scores
+    return (
+        article_id, article_id.upper(), "", category, source_document_id,
+        0, "", quality_score, 1.0, 1.0,
+    )
+
+
+def test_deduplication_keeps_the_best_rescored_chunk_per_document(hybrid_search):
+    engine = object.__new__(hybrid_search.HybridSearchEngine)
+    articles = {
+        "a": _article("a", "REFERENCE", "doc-1"),
+        "b": _article("b", "POLICY", "doc-1"),
+        "c": _article("c", "REFERENCE", "doc-2", quality_score=0.5),
+    }
+    fused = [("a", 1.0), ("b", 0.9), ("c", 0.8)]
+
+    boosted = engine._format_results(fused, articles, 2, "POLICY", deduplicate=True)
+    assert [r["article_id"] for r in boosted] == ["b", "c"]
+
+    plain = engine._format_results(fused, articles, 3, deduplicate=True)
+    assert [r["article_id"] for r in plain] == ["a", "c"]
+
+    undeduplicated = engine._format_results(fused, articles, 3)
+    assert [r["article_id"] for r in undeduplicated] == ["a", "b", "c"]
+
+
+def test_deduplication_reaches_past_the_top_candidates(hybrid_search):
+    engine = object.__new__(hybrid_search.HybridSearchEngine)
+    # 40 candidates over 13 documents: the top 30 cover only 3 of them
+    fused = []
+    articles = {}
+    for rank in range(40):
+        doc = f"doc-{rank // 10}" if rank < 30 else f"doc-{rank}"
+        article_id = f"a{rank}"
+        articles[article_id] = _article(article_id, "REFERENCE", doc)
+        fused.append((article_id, 1.0 - rank / 100))
+    # A low-ranked chunk lifted above everything by the category boost
+    articles["a39"] = _article("a39", "POLICY", "doc-39", quality_score=2.0)
+
+    results = engine._format_results(fused, articles, 10, "POLICY", deduplicate=True)
+
+    assert len(results) == 10
+    assert results[0]["article_id"] == "a39"
+    assert len({articles[r["article_id"]][4] for r in results}) == 10
+
+
+def test_query_log_wait_covers_only_the_requested_row(hybrid_search, monkeypatch):
+    release = threading.Event()
+
+    def write(self, batch):
+        if any(row[0] == "q2" for row in batch):
+            release.wait(5)
+
+    monkeypatch.setattr(hybrid_search.QueryLogWriter, "_write", write)
+    monkeypatch.setattr(hybrid_search.QueryLogWriter, "FLUSH_INTERVAL", 0.01)
+    writer = hybrid_search.QueryLogWriter()
+    try:
+        writer.log(("q1",))
+        assert writer.wait_for("q1", timeout=2)
+
+        writer.log(("q2",))
+        # q2's write is stuck; waiting on q1 must not wait for it
+        assert writer.wait_for("q1", timeout=0.1)
+        assert writer.wait_for("q2", timeout=0.1) is False
+
+        release.set()
+        assert writer.wait_for("q2", timeout=2)
+    finally:
+        release.set()
+        writer.close()
+
+
+class _RecordingCursor:
+    def __init__(self, rows=()):
+        self.statements = []
+        self.rows = list(rows)
+
+    def execute(self, sql, params=None):
+        self.statements.append(sql)
+
+    def fetchone(self):
+        return self.rows.pop(0)
+
+
+def test_sessions_reprepare_vector_search_when_the_halfvec_index_changes(hybrid_search):
+    engine = object.__new__(hybrid_search.HybridSearchEngine)
+    engine.vector_search_enabled = True
+    engine.halfvec_dim = None
+    engine._article_cache_checked = 0.0
+    engine._article_cache_version = 1
+    session = hybrid_search.SearchSession.__new__(hybrid_search.SearchSession)
+    session.vector_cur = _RecordingCursor()
+    session.vector_sql = None
+
+    engine._prepare_vector_search(session)
+    assert session.vector_sql == engine.VECTOR_SQL
+    engine._prepare_vector_search(session)
+    assert len(session.vector_cur.statements) == 1
+
+    # rebuild_indexes built the halfvec index; the periodic check finds it
+    engine._check_article_cache_version(_RecordingCursor(rows=[(768,), (1,)]))
+    assert engine.halfvec_dim == 768
+
+    engine._prepare_vector_search(session)
+    assert session.vector_cur.statements[1:] == [
+        "DEALLOCATE search_vector",
+        "PREPARE search_vector (vector, int) AS " + engine.HALFVEC_SQL.format(dim=768),
+    ]
@@ -2,6 +2,7 @@ import string
 import sys
 from pathlib import Path
 
+import numpy as np
 from hypothesis import given, strategies as st
 
 SEARCH_API_DIR = Path(__file__).resolve().parents[1]
@@ -15,10 +16,13 @@ from intent_detection import IntentDetector  # noqa: E402
 def test_keyword_detection_expected_examples(monkeypatch):
     monkeypatch.setattr(intent_detection, "_MODEL", None)
     monkeypatch.setattr(intent_detection, "_MODEL_LOADED", True)
+    IntentDetector._detect_cached.cache_clear()
 
     assert IntentDetector.detect("Can I use a flash drive?")[0] == "policy"
     assert IntentDetector.detect("How do I reset my password?")[0] == "procedure"
     assert IntentDetector.detect("What is VPN?")[0] in {"reference", "unknown"}
+    assert IntentDetector.detect("  ") == ("unknown", 0.0)
+    IntentDetector._detect_cached.cache_clear()
 
 
 @given(
@@ -32,3 +36,89 @@ def test_keyword_detector_bounds_and_labels(query):
     intent, confidence = IntentDetector._detect_keywords(query)
     assert intent in {"policy", "procedure", "reference", "unknown"}
     assert 0.0 <= confidence <= 1.0
+
+
+def test_priority_trie_regex_counts_each_phrase_once():
+    pattern = IntentDetector.PROCEDURE_PRIORITY_RE
+
+    for phrase in IntentDetector.PROCEDURE_PRIORITY:
+        assert pattern.findall(phrase) == [phrase]
+    assert set(pattern.findall("how do i reset it? how do i, steps to")) == {"how do i", "steps to"}
+
+
+class _FakeIntentModel:
+    classes_ = np.array(["policy", "procedure", "reference"])
+
+    def __init__(self):
+        self.calls = 0
+
+    def predict_proba(self, queries):
+        self.calls += 1
+        rows = []
+        for query in queries:
+            if "how" in query.lower():
+                rows.append([0.1, 0.8, 0.1])
+            else:
+                rows.append([0.35, 0.35, 0.3])
+        return np.array(rows)
+
+
+def test_ml_detection_batches_and_caches(monkeypatch):
+    model = _FakeIntentModel()
+    monkeypatch.setattr(intent_detection, "_MODEL", model)
+    monkeypatch.setattr(intent_detection, "_MODEL_LOADED", True)
+    IntentDetector._detect_cached.cache_clear()
+
+    assert IntentDetector.detect_batch(["How do I log in?", "printer"]) == [
+        ("procedure", 0.8),
+        ("unknown", 0.65),
+    ]
+    assert model.calls == 1
+
+    assert IntentDetector.detect("How do I log in?") == ("procedure", 0.8)
+    assert IntentDetector.detect("how do i LOG IN?") == ("procedure", 0.8)
+    assert model.calls == 2
+    IntentDetector._detect_cached.cache_clear()
+
+
+def test_detect_batch_matches_detect(monkeypatch):
+    model = _FakeIntentModel()
+    monkeypatch.setattr(intent_detection, "_MODEL", model)
+    monkeypatch.setattr(intent_detection, "_MODEL_LOADED", True)
+    IntentDetector._detect_cached.cache_clear()
+
+    queries = ["ab", "  HOW do I log in?  ", "   ", "printer"]
+    assert IntentDetector.detect_batch(queries) == [IntentDetector.detect(q) for q in queries]
+    assert IntentDetector.detect_batch(["ab"]) == [("unknown", 0.0)]
+    IntentDetector._detect_cached.cache_clear()
+
+
+def test_murmurhash_matches_sklearn_reference_values():
+    assert intent_detection._murmurhash3_32(b"foo") == -156908512
+    assert intent_detection._murmurhash3_32(b"usb policy") == 1324189073
+
+
+def test_flat_model_scores_hashed_ngrams(tmp_path):
+    # 16 buckets: "vpn" hashes to 12, "usb policy" to 1, "foo" to 0
+    coef = np.zeros((3, 16), dtype=np.float32)
+    coef[0, 1] = 4.0
+    coef[1, 12] = 4.0
+    path = tmp_path / "intent_model.npz"
+    np.savez_compressed(
+        path,
+        n_features=np.int64(16),
+        ngram_range=np.array([1, 2]),
+        idf=np.ones(16, dtype=np.float32),
+        coef=coef,
+        intercept=np.zeros(3, dtype=np.float32),
+        calib_a=np.full(3, -1.0),
+        calib_b=np.zeros(3),
+        classes=np.array(["policy", "procedure", "reference"]),
+    )
+    model = intent_detection.FlatIntentModel.load(path)
+
+    proba = model.predict_proba(["VPN", "usb policy", "?"])
+
+    assert list(model.classes_[proba.argmax(axis=1)][:2]) == ["procedure", "policy"]
+    np.testing.assert_allclose(proba.sum(axis=1), 1.0, rtol=1e-6)
+    np.testing.assert_allclose(proba[2], 1 / 3)
@@ -0,0 +1,99 @@
+import struct
+import sys
+import uuid
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+
+SEARCH_API_DIR = Path(__file__).resolve().parents[1]
+if str(SEARCH_API_DIR) not in sys.path:
+    sys.path.insert(0, str(SEARCH_API_DIR))
+
+
+@pytest.fixture(scope="module")
+def rebuild_indexes():
+    # Imported once conftest has stubbed sentence_transformers, which
+    # embedding_service needs
+    import rebuild_indexes
+
+    return rebuild_indexes
+
+
+def test_encode_copy_rows_writes_pgvector_binary_format(rebuild_indexes):
+    ids = [uuid.uuid4(), str(uuid.uuid4())]
+    embeddings = np.array([[0.5, -1.0, 2.0], [0.0, 0.25, 1.5]], dtype=np.float32)
+
+    payload = rebuild_indexes.encode_copy_rows(ids, embeddings)
+
+    assert payload.startswith(b"PGCOPY\n\xff\r\n\x00" + b"\x00" * 8)
+    assert payload.endswith(b"\xff\xff")
+    body = payload[19:-2]
+    row_size = 2 + 4 + 16 + 4 + 2 + 2 + 4 * 3
+    assert len(body) == 2 * row_size
+
+    for i, article_id in enumerate(ids):
+        row = body[i * row_size:(i + 1) * row_size]
+        field_count, id_len = struct.unpack("!hi", row[:6])
+        assert (field_count, id_len) == (2, 16)
+        assert row[6:22] == uuid.UUID(str(article_id)).bytes
+        vector_len, dim, unused = struct.unpack("!ihh", row[22:30])
+        assert (vector_len, dim, unused) == (16, 3, 0)
+        assert struct.unpack("!3f", row[30:]) == tuple(embeddings[i].tolist())
+
+
+class _RecordingCursor:
+    def __init__(self, rows=()):
+        self.statements = []
+        self.rows = list(rows)
+
+    def execute(self, sql):
+        self.statements.append(sql)
+
+    def fetchone(self):
+        return self.rows.pop(0)
+
+
+def test_prepare_embedding_writes_creates_staging_table_then_prepares(rebuild_indexes):
+    cur = _RecordingCursor()
+
+    rebuild_indexes.prepare_embedding_writes(cur)
+
+    assert cur.statements[0] == rebuild_indexes.STAGING_TABLE_SQL
+    assert cur.statements[1].startswith("PREPARE apply_embeddings AS")
+    assert cur.statements[2] == "SET synchronous_commit = off"
+
+
+def test_ensure_search_indexes_swaps_full_precision_hnsw_for_halfvec(rebuild_indexes):
+    cur = _RecordingCursor(rows=[(True,), (768,)])
+
+    assert rebuild_indexes.ensure_search_indexes(cur) is True
+
+    sql = "\n".join(cur.statements)
+    assert "embedding::halfvec(768)) halfvec_cosine_ops" in sql
+    assert "vector_cosine_ops" not in sql
+    for name in rebuild_indexes.FULL_PRECISION_HNSW_INDEXES:
+        assert f"DROP INDEX CONCURRENTLY IF EXISTS {name}" in cur.statements
+
+
+def test_ensure_search_indexes_keeps_full_precision_without_halfvec(rebuild_indexes):
+    cur = _RecordingCursor(rows=[(False,)])
+
+    assert rebuild_indexes.ensure_search_indexes(cur) is False
+
+    sql = "\n".join(cur.statements)
+    assert "halfvec_cosine_ops" not in sql
+    assert "embedding vector_cosine_ops" in sql
+    assert "DROP INDEX" not in sql
+
+
+def test_ensure_search_indexes_needs_a_typed_embedding_column_for_halfvec(rebuild_indexes):
+    cur = _RecordingCursor(rows=[(True,), (-1,)])
+
+    assert rebuild_indexes.ensure_search_indexes(cur) is False
+
+    sql = "\n".join(cur.statements)
+    assert "halfvec(-1)" not in sql
+    assert "embedding vector_cosine_ops" in sql
+    assert "DROP INDEX" not in sql
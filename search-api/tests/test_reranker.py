@@ -0,0 +1,68 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+
+SEARCH_API_DIR = Path(__file__).resolve().parents[1]
+if str(SEARCH_API_DIR) not in sys.path:
+    sys.path.insert(0, str(SEARCH_API_DIR))
+
+
+@pytest.fixture(scope="module")
+def Reranker():
+    # Imported once conftest has stubbed sentence_transformers
+    from reranker import Reranker
+
+    return Reranker
+
+
+class FakeCrossEncoder:
+    def __init__(self, scores):
+        self.scores = scores
+        self.pairs = None
+
+    def predict(self, pairs, **kwargs):
+        self.pairs = pairs
+        return self.scores
+
+
+def _reranker(Reranker, scores):
+    reranker = Reranker.__new__(Reranker)
+    reranker.model = FakeCrossEncoder(scores)
+    return reranker
+
+
+def test_rerank_blends_normalized_scores_and_sorts(Reranker):
+    reranker = _reranker(Reranker, [2.0, -1.0, 5.0])
+    candidates = [
+        {"title": "A", "content_preview": "a", "fusion_score": 0.5},
+        {"title": "B", "content_preview": "b", "fusion_score": 0.9},
+        {"title": "C", "content_preview": "c", "fusion_score": 0.1},
+    ]
+
+    results = reranker.rerank("query", candidates, top_k=2)
+
+    assert [r["title"] for r in results] == ["B", "A"]
+    assert results[0]["rerank_score"] == -1.0
+    assert results[0]["fusion_score"] == Reranker.FUSION_WEIGHT
+    assert abs(results[1]["fusion_score"] - (0.15 * 0.5 + 0.85 * 0.5)) < 1e-9
+
+
+def test_rerank_keeps_input_order_on_ties(Reranker):
+    reranker = _reranker(Reranker, [1.0, 1.0, 1.0])
+    candidates = [{"title": t, "fusion_score": 0.4} for t in ("x", "y", "z")]
+
+    results = reranker.rerank("query", candidates)
+
+    assert [r["title"] for r in results] == ["x", "y", "z"]
+    assert all(r["fusion_score"] == 0.0 for r in results)
+
+
+def test_clean_passage_strips_trailing_sections_and_whitespace(Reranker):
+    reranker = _reranker(Reranker, [])
+
+    text = "USB  policy\n\nDetails here.\nAttachments: a.pdf\nRelated Articles: x"
+
+    assert reranker._clean_passage(text) == "USB policy Details here."
+    assert len(reranker._clean_passage("word " * 200)) == 512
@@ -7,11 +7,14 @@ SEARCH_API_DIR = Path(__file__).resolve().parents[1]
 if str(SEARCH_API_DIR) not in sys.path:
     sys.path.insert(0, str(SEARCH_API_DIR))
 
+import runtime_config  # noqa: E402
 from runtime_config import (  # noqa: E402
     RuntimeConfig,
     RuntimeConfigError,
+    claim_backend_check,
     DEFAULT_API_KEY,
     load_runtime_config,
+    reload_runtime_config,
     validate_runtime_config,
 )
 
@@ -86,3 +89,25 @@ def test_validate_runtime_config_allows_development_defaults():
     )
 
     assert validate_runtime_config(config) == []
+
+
+def test_load_runtime_config_caches_process_environment(monkeypatch):
+    monkeypatch.setenv("ASSISTSUPPORT_API_PORT", "3100")
+    config = reload_runtime_config()
+    assert config.api_port == 3100
+
+    monkeypatch.setenv("ASSISTSUPPORT_API_PORT", "3200")
+    assert load_runtime_config() is config
+
+    assert reload_runtime_config().api_port == 3200
+    monkeypatch.delenv("ASSISTSUPPORT_API_PORT")
+    reload_runtime_config()
+
+
+def test_claim_backend_check_is_granted_once_per_parent(tmp_path):
+    pytest.importorskip("fcntl")
+
+    assert claim_backend_check(str(tmp_path)) is True
+    assert claim_backend_check(str(tmp_path)) is False
+
+    runtime_config._BACKEND_CHECK_LOCKS.pop().close()
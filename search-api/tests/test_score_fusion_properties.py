@@ -63,3 +63,22 @@ def test_weighted_combination_handles_negative_bm25_scores():
 
 def test_adaptive_fusion_returns_empty_when_inputs_empty():
     assert ScoreFusion.adaptive_fusion([], [], "policy") == []
+
+
+def test_weighted_combination_matches_scalar_scores():
+    bm25 = [(f"doc-{i}", float(i % 17)) for i in range(80)]
+    vector = [(f"doc-{i}", (i % 11) / 10.0) for i in range(40, 120)]
+
+    fused = ScoreFusion.weighted_combination(bm25, vector)
+
+    bm25_max = max(score for _, score in bm25)
+    expected = {article_id: 0.0 for article_id, _ in bm25 + vector}
+    for article_id, score in bm25:
+        expected[article_id] += 0.3 * min(1.0, score / bm25_max)
+    for article_id, score in vector:
+        expected[article_id] += 0.6 * min(1.0, score)
+
+    assert len(fused) == len(expected)
+    assert fused == sorted(fused, key=lambda pair: pair[1], reverse=True)
+    for article_id, score in fused:
+        assert abs(score - expected[article_id]) < 1e-12
@@ -1,5 +1,5 @@
+import json
 import sys
-import types
 from pathlib import Path
 
 import pytest
@@ -9,26 +9,6 @@ SEARCH_API_DIR = Path(__file__).resolve().parents[1]
 if str(SEARCH_API_DIR) not in sys.path:
     sys.path.insert(0, str(SEARCH_API_DIR))
 
-
-# Stub heavy modules before importing the Flask app module.
-if "hybrid_search" not in sys.modules:
-    hybrid_search_stub = types.ModuleType("hybrid_search")
-
-    class _PlaceholderHybridSearchEngine:
-        pass
-
-    hybrid_search_stub.HybridSearchEngine = _PlaceholderHybridSearchEngine
-    sys.modules["hybrid_search"] = hybrid_search_stub
-
-if "intent_detection" not in sys.modules:
-    intent_detection_stub = types.ModuleType("intent_detection")
-
-    class _PlaceholderIntentDetector:
-        pass
-
-    intent_detection_stub.IntentDetector = _PlaceholderIntentDetector
-    sys.modules["intent_detection"] = intent_detection_stub
-
 import search_api  # noqa: E402
 from runtime_config import RuntimeConfigError  # noqa: E402
 
@@ -91,14 +71,29 @@ class FakeEngine:
         }
 
 
+@pytest.fixture(scope="module")
+def app_client():
+    """One Flask test client shared by the module's tests."""
+    search_api.app.config["TESTING"] = True
+    with search_api.app.test_client() as test_client:
+        yield test_client
+
+
 @pytest.fixture
-def client(monkeypatch):
+def client(app_client, monkeypatch):
     fake = FakeEngine()
-    monkeypatch.setattr(search_api, "_engine", fake)
     monkeypatch.setattr(search_api, "_get_engine", lambda: fake)
-    search_api.app.config["TESTING"] = True
-    with search_api.app.test_client() as test_client:
-        yield test_client, fake
+    yield app_client, fake
+
+
+def call_view(view, path, **request_kwargs):
+    """
+    Invoke a POST view function inside a test request context, skipping the
+    test client's WSGI round trip. For handler-level validation checks only:
+    before_request hooks and error handlers do not run.
+    """
+    with search_api.app.test_request_context(path, method="POST", **request_kwargs):
+        return search_api.app.make_response(view())
 
 
 def test_health_endpoint(client):
@@ -112,7 +107,7 @@ def test_health_endpoint(client):
 
 def test_search_happy_path_with_scores(client, monkeypatch):
     test_client, fake_engine = client
-    monkeypatch.setenv("ENVIRONMENT", "development")
+    monkeypatch.setattr(search_api, "_IS_PROD", False)
 
     response = test_client.post(
         "/search",
@@ -129,9 +124,8 @@ def test_search_happy_path_with_scores(client, monkeypatch):
 
 
 def test_search_rejects_invalid_or_malformed_input(client):
-    test_client, _ = client
-
-    malformed = test_client.post(
+    malformed = call_view(
+        search_api.search,
         "/search",
         data="{not-json",
         content_type="application/json",
@@ -139,11 +133,11 @@ def test_search_rejects_invalid_or_malformed_input(client):
     assert malformed.status_code == 400
     assert malformed.get_json()["error"] == "Request body required"
 
-    non_string = test_client.post("/search", json={"query": ["bad"], "top_k": 3})
+    non_string = call_view(search_api.search, "/search", json={"query": ["bad"], "top_k": 3})
     assert non_string.status_code == 400
     assert non_string.get_json()["error"] == "Query must be a string"
 
-    bad_top_k = test_client.post("/search", json={"query": "ok", "top_k": "ten"})
+    bad_top_k = call_view(search_api.search, "/search", json={"query": "ok", "top_k": "ten"})
     assert bad_top_k.status_code == 400
     assert bad_top_k.get_json()["error"] == "top_k must be an integer"
 
@@ -165,14 +159,16 @@ def test_search_engine_failures_are_handled(client):
 def test_feedback_endpoint_validation_and_success(client):
     test_client, fake_engine = client
 
-    invalid_rank = test_client.post(
+    invalid_rank = call_view(
+        search_api.submit_feedback,
         "/feedback",
         json={"query_id": "q1", "result_rank": "first", "rating": "helpful"},
     )
     assert invalid_rank.status_code == 400
     assert invalid_rank.get_json()["error"] == "result_rank must be a positive integer"
 
-    invalid_rating = test_client.post(
+    invalid_rating = call_view(
+        search_api.submit_feedback,
         "/feedback",
         json={"query_id": "q1", "result_rank": 1, "rating": "great"},
     )
@@ -191,10 +187,23 @@ def test_feedback_endpoint_validation_and_success(client):
     )
     assert success.status_code == 200
     assert success.get_json()["status"] == "success"
+    search_api._feedback_queue.join()
     assert len(fake_engine.feedback_calls) == 1
     assert fake_engine.feedback_calls[0]["rating"] == "helpful"
 
 
+def test_non_object_json_bodies_are_rejected(client):
+    _, fake_engine = client
+
+    search = call_view(search_api.search, "/search", json=["flash drive"])
+    assert search.status_code == 400
+    assert search.get_json()["error"] == "Request body required"
+
+    feedback = call_view(search_api.submit_feedback, "/feedback", json=["q1", 1, "helpful"])
+    assert feedback.status_code == 400
+    assert fake_engine.feedback_calls == []
+
+
 def test_stats_and_not_found_endpoints(client):
     test_client, _ = client
 
@@ -211,7 +220,7 @@ def test_stats_and_not_found_endpoints(client):
 
 def test_authentication_checks_apply_in_production(client, monkeypatch):
     test_client, _ = client
-    monkeypatch.setenv("ENVIRONMENT", "production")
+    monkeypatch.setattr(search_api, "_IS_PROD", True)
     monkeypatch.setattr(search_api, "API_KEY", "secret-key")
 
     missing_auth = test_client.post("/search", json={"query": "policy"})
@@ -231,13 +240,10 @@ def test_authentication_checks_apply_in_production(client, monkeypatch):
     )
     assert correct_auth.status_code == 200
 
-    # Reset env for neighboring tests if run in shared process.
-    monkeypatch.setenv("ENVIRONMENT", "development")
-
 
 def test_production_errors_hide_internal_messages(client, monkeypatch):
     test_client, fake_engine = client
-    monkeypatch.setenv("ENVIRONMENT", "production")
+    monkeypatch.setattr(search_api, "_IS_PROD", True)
     monkeypatch.setattr(search_api, "API_KEY", "secret-key")
     auth = {"Authorization": "Bearer secret-key"}
 
@@ -249,7 +255,7 @@ def test_production_errors_hide_internal_messages(client, monkeypatch):
     def _raise_feedback_error(*_args, **_kwargs):
         raise RuntimeError("simulated feedback failure")
 
-    monkeypatch.setattr(fake_engine, "_log_feedback", _raise_feedback_error)
+    monkeypatch.setattr(search_api, "_enqueue_feedback", _raise_feedback_error)
     feedback_response = test_client.post(
         "/feedback",
         json={"query_id": "q1", "result_rank": 1, "rating": "helpful"},
@@ -259,6 +265,22 @@ def test_production_errors_hide_internal_messages(client, monkeypatch):
     assert feedback_response.get_json()["error"] == "Internal server error"
 
 
+def test_feedback_is_rejected_when_the_queue_is_full(client, monkeypatch):
+    test_client, fake_engine = client
+    monkeypatch.setattr(search_api, "_feedback_queue", search_api.queue.Queue(maxsize=1))
+    # Pretend the writer is running so nothing drains the full queue
+    monkeypatch.setattr(search_api, "_feedback_worker", object())
+    search_api._feedback_queue.put_nowait(("q0", 1, "helpful", "", None))
+
+    response = test_client.post(
+        "/feedback",
+        json={"query_id": "q1", "result_rank": 1, "rating": "helpful"},
+    )
+
+    assert response.status_code == 503
+    assert fake_engine.feedback_calls == []
+
+
 def test_run_server_rejects_default_rate_limit_storage_in_production(monkeypatch):
     monkeypatch.setenv("ENVIRONMENT", "production")
     monkeypatch.setenv("ASSISTSUPPORT_API_KEY", "secret-key")
@@ -266,3 +288,73 @@ def test_run_server_rejects_default_rate_limit_storage_in_production(monkeypatch
 
     with pytest.raises(RuntimeConfigError, match="ASSISTSUPPORT_RATE_LIMIT_STORAGE_URI"):
         search_api.run_server()
+
+
+def test_config_and_stats_honor_if_none_match(client):
+    test_client, _ = client
+
+    config = test_client.get("/config")
+    assert config.status_code == 200
+    assert config.get_json()["version"] == "1.0.0"
+    assert config.headers["Cache-Control"] == "public, max-age=3600"
+    etag = config.headers["ETag"]
+
+    cached_config = test_client.get("/config", headers={"If-None-Match": etag})
+    assert cached_config.status_code == 304
+    assert cached_config.data == b""
+
+    stats = test_client.get("/stats")
+    assert stats.status_code == 200
+    assert stats.headers["Cache-Control"] == "private, max-age=60"
+
+    cached_stats = test_client.get("/stats", headers={"If-None-Match": stats.headers["ETag"]})
+    assert cached_stats.status_code == 304
+
+
+def test_encoded_results_are_reused_only_for_the_same_engine_results():
+    results = [
+        {
+            "article_id": "article-1",
+            "title": "USB Policy",
+            "category": "POLICY",
+            "content_preview": "USB devices are restricted",
+            "bm25_score": 1.23456,
+            "vector_score": 0.8,
+            "fusion_score": 0.9,
+        }
+    ]
+    key = ("usb", 5, True, "adaptive")
+
+    first = search_api._cached_results_json(key, results, True)
+    rows = json.loads(first)
+    assert rows[0]["rank"] == 1
+    assert rows[0]["scores"]["bm25"] == 1.23456
+    assert search_api._cached_results_json(key, results, True) is first
+
+    refreshed = [dict(results[0], title="USB Policy v2")]
+    second = search_api._cached_results_json(key, refreshed, True)
+    assert second is not first
+    assert json.loads(second)[0]["title"] == "USB Policy v2"
+
+
+def test_app_json_provider_serializes_numpy_scores():
+    np = pytest.importorskip("numpy")
+
+    with search_api.app.app_context():
+        response = search_api.app.json.response({"fused": np.float32(0.5)})
+
+    assert response.mimetype == "application/json"
+    assert search_api.app.json.loads(response.get_data()) == {"fused": 0.5}
+
+
+def test_oversized_bodies_are_rejected_before_parsing(client):
+    test_client, _ = client
+
+    response = test_client.post(
+        "/search",
+        data=b'{"query": "' + b"x" * search_api.MAX_REQUEST_BYTES + b'"}',
+        content_type="application/json",
+    )
+
+    assert response.status_code == 413
+    assert "exceeds" in response.get_json()["error"]
@@ -1,10 +1,12 @@
 #!/usr/bin/env python3
 """
 Step 10: Train a lightweight intent classifier to replace keyword-based detection.
-Uses TF-IDF features + Logistic Regression trained on synthetic + real query data.
+Uses TF-IDF features + a calibrated linear SVM trained on synthetic + real query data.
 Exports a joblib model for use in production.
 """
 
+import argparse
+import hashlib
 import sys
 import os
 import json
@@ -12,12 +14,21 @@ import json
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 from db_config import connect_db
 
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.linear_model import LogisticRegression
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer
+from sklearn.calibration import CalibratedClassifierCV
 from sklearn.model_selection import cross_val_score
 from sklearn.pipeline import Pipeline
+from sklearn.svm import LinearSVC
 import joblib
+import numpy as np
 
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_PATH = os.path.join(SCRIPT_DIR, "intent_model.joblib")
+# Flat NumPy export of the fitted pipeline, served without importing sklearn
+FLAT_MODEL_PATH = os.path.join(SCRIPT_DIR, "intent_model.npz")
+META_PATH = os.path.join(SCRIPT_DIR, "intent_model_meta.json")
+# Fitted TF-IDF steps, reused by later runs that see the same training split
+TFIDF_CACHE_DIR = os.path.join(SCRIPT_DIR, ".tfidf_cache")
 
 # Synthetic training data covering IT support query patterns
 TRAINING_DATA = [
@@ -186,26 +197,145 @@ TRAINING_DATA = [
 def load_real_queries():
     """Load and deduplicate real queries from the database."""
     conn = connect_db()
-    cur = conn.cursor()
+    # Server-side cursor: rows stream in itersize chunks instead of the whole
+    # query log being materialized by fetchall()
+    cur = conn.cursor(name="real_queries_stream")
+    cur.itersize = 2000
+    # One row per case-insensitive query (its most confident label), so
+    # repeated searches never reach Python
     cur.execute("""
-        SELECT DISTINCT query_text, category_filter, intent_confidence
+        SELECT DISTINCT ON (lower(query_text)) query_text, category_filter, intent_confidence
         FROM query_performance
         WHERE intent_confidence >= 0.4
-        ORDER BY intent_confidence DESC
+        ORDER BY lower(query_text), intent_confidence DESC
     """)
-    rows = cur.fetchall()
-    cur.close()
-    conn.close()
 
     # Only use high-confidence labels
     real_data = []
-    for query, intent, conf in rows:
+    for query, intent, conf in cur:
         if intent and conf >= 0.4:
             real_data.append((query, intent))
+    cur.close()
+    conn.close()
     return real_data
 
 
+def build_pipeline():
+    """TF-IDF + calibrated linear SVM; the fitted TF-IDF step is cached on disk by its input."""
+    return Pipeline([
+        # Hashed n-grams: no vocabulary_ dict to pickle or look tokens up in.
+        # Raw counts go to TfidfTransformer for the sublinear TF + IDF weighting.
+        ("tfidf", Pipeline([
+            ("hash", HashingVectorizer(
+                ngram_range=(1, 2),
+                n_features=2**15,
+                alternate_sign=False,
+                norm=None,
+                # fp32 CSR halves the memory traffic of the sparse matvecs
+                dtype=np.float32,
+            )),
+            ("idf", TfidfTransformer(sublinear_tf=True)),
+        ])),
+        # Linear SVM: one sparse matvec per query at serve time. Sigmoid
+        # calibration keeps predict_proba for the detector's confidence
+        # threshold; ensemble=False ships a single SVM, not one per fold
+        ("clf", CalibratedClassifierCV(
+            LinearSVC(C=1.0, class_weight="balanced", dual=True),
+            cv=3,
+            ensemble=False,
+        )),
+    ], memory=joblib.Memory(location=TFIDF_CACHE_DIR, verbose=0))
+
+
+def corpus_hash(texts, labels, pipeline) -> str:
+    """
+    Order-independent fingerprint of the labeled training corpus and the
+    pipeline configuration, so changing either invalidates the saved model.
+    """
+    lines = sorted(f"{label}\t{text}" for text, label in zip(texts, labels))
+    lines.append(repr(pipeline.steps))
+    return hashlib.sha1("\n".join(lines).encode()).hexdigest()
+
+
+def load_cached_model(digest):
+    """Return (pipeline, meta) if the saved model was trained on this corpus."""
+    try:
+        with open(META_PATH) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if meta.get("corpus_hash") != digest or not os.path.exists(MODEL_PATH):
+        return None
+    return joblib.load(MODEL_PATH), meta
+
+
+def train(pipeline, texts, labels, cv_folds=None):
+    """
+    Fit the pipeline on all examples, cross-validating first when cv_folds
+    is set. Returns (pipeline, mean CV accuracy or None).
+    """
+    cv_accuracy = None
+    if cv_folds:
+        scores = cross_val_score(pipeline, texts, labels, cv=cv_folds, scoring="accuracy")
+        cv_accuracy = float(scores.mean())
+        print(f"{cv_folds}-fold CV accuracy: {cv_accuracy:.3f} (+/- {scores.std():.3f})")
+        print(f"  Per-fold: {[f'{s:.3f}' for s in scores]}")
+        print()
+
+    # Train on full data; the exported model must not reference the cache dir
+    pipeline.fit(texts, labels)
+    pipeline.set_params(memory=None)
+    return pipeline, cv_accuracy
+
+
+def export_flat_model(pipeline, path=FLAT_MODEL_PATH):
+    """
+    Save the arrays intent_detection.FlatIntentModel needs to reproduce
+    pipeline.predict_proba: hashing parameters, IDF weights, the single SVM's
+    coefficients and the per-class sigmoid calibration.
+    """
+    hasher = pipeline.named_steps["tfidf"].named_steps["hash"]
+    idf = pipeline.named_steps["tfidf"].named_steps["idf"]
+    calibrated = pipeline.named_steps["clf"].calibrated_classifiers_[0]
+    svm = calibrated.estimator
+    np.savez_compressed(
+        path,
+        n_features=np.int64(hasher.n_features),
+        ngram_range=np.array(hasher.ngram_range, dtype=np.int64),
+        idf=idf.idf_.astype(np.float32),
+        coef=svm.coef_.astype(np.float32),
+        intercept=svm.intercept_.astype(np.float32),
+        calib_a=np.array([c.a_ for c in calibrated.calibrators], dtype=np.float64),
+        calib_b=np.array([c.b_ for c in calibrated.calibrators], dtype=np.float64),
+        classes=np.asarray(pipeline.classes_).astype(str),
+    )
+
+
 def main():
+    parser = argparse.ArgumentParser(description="Train the intent classifier")
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Retrain even if the saved model was trained on the same corpus",
+    )
+    # CV costs several fits for a diagnostic number; nightly CI passes --cv
+    parser.add_argument(
+        "--cv",
+        action=argparse.BooleanOptionalAction,
+        default=False,
+        help="Cross-validate before the final fit (default: --no-cv)",
+    )
+    parser.add_argument(
+        "--cv-folds",
+        type=int,
+        default=5,
+        metavar="N",
+        help="Number of folds when --cv is given (default: 5)",
+    )
+    args = parser.parse_args()
+    if args.cv and args.cv_folds < 2:
+        parser.error("--cv-folds must be at least 2")
+
     print("=" * 70)
     print("  Step 10: Train Intent Classifier")
     print("=" * 70)
@@ -216,15 +346,12 @@ def main():
     print(f"Synthetic training examples: {len(TRAINING_DATA)}")
     print(f"Real query examples (conf >= 0.4): {len(real_queries)}")
 
-    all_data = TRAINING_DATA + real_queries
-    # Deduplicate by lowercase query
-    seen = set()
-    deduped = []
-    for query, label in all_data:
-        key = query.lower().strip()
-        if key not in seen:
-            seen.add(key)
-            deduped.append((query, label))
+    # Deduplicate by case-folded query in one pass; the first (synthetic)
+    # label wins and insertion order is kept
+    unique = {}
+    for query, label in TRAINING_DATA + real_queries:
+        unique.setdefault(query.casefold().strip(), (query, label))
+    deduped = list(unique.values())
 
     texts = [d[0] for d in deduped]
     labels = [d[1] for d in deduped]
@@ -238,31 +365,20 @@ def main():
         print(f"  {intent}: {count}")
     print()
 
-    # Build pipeline
-    pipeline = Pipeline([
-        ("tfidf", TfidfVectorizer(
-            ngram_range=(1, 2),
-            max_features=5000,
-            sublinear_tf=True,
-            min_df=1,
-        )),
-        ("clf", LogisticRegression(
-            C=10.0,
-            max_iter=1000,
-            class_weight="balanced",
-            solver="lbfgs",
-            multi_class="multinomial",
-        )),
-    ])
-
-    # Cross-validate
-    scores = cross_val_score(pipeline, texts, labels, cv=5, scoring="accuracy")
-    print(f"5-fold CV accuracy: {scores.mean():.3f} (+/- {scores.std():.3f})")
-    print(f"  Per-fold: {[f'{s:.3f}' for s in scores]}")
-    print()
-
-    # Train on full data
-    pipeline.fit(texts, labels)
+    pipeline = build_pipeline()
+    digest = corpus_hash(texts, labels, pipeline)
+    cached = None if args.force else load_cached_model(digest)
+    if cached is not None:
+        pipeline, meta = cached
+        print(f"Training corpus and config unchanged (sha1 {digest[:12]}); reusing {MODEL_PATH}")
+        if meta.get("cv_accuracy") is not None:
+            print(f"  Saved CV accuracy: {meta['cv_accuracy']:.3f}")
+        print("  (use --force to retrain)")
+        print()
+    else:
+        pipeline, cv_accuracy = train(
+            pipeline, texts, labels, cv_folds=args.cv_folds if args.cv else None
+        )
 
     # Test on our standard query set
     test_queries = [
@@ -290,29 +406,34 @@ def main():
 
     print("Test predictions:")
     print("-" * 60)
-    for query in test_queries:
-        pred = pipeline.predict([query])[0]
-        proba = pipeline.predict_proba([query])[0]
-        classes = pipeline.classes_
-        conf = max(proba)
+    # One transform + predict_proba over the whole set instead of two calls per query
+    probas = pipeline.predict_proba(test_queries)
+    preds = pipeline.classes_[probas.argmax(axis=1)]
+    confs = probas.max(axis=1)
+    for query, pred, conf in zip(test_queries, preds, confs):
         print(f"  {query:45s} → {pred:10s} ({conf:.2f})")
 
-    # Save model
-    model_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "intent_model.joblib")
-    joblib.dump(pipeline, model_path)
-    print(f"\nModel saved to: {model_path}")
-    print(f"Model size: {os.path.getsize(model_path) / 1024:.1f} KB")
-
-    # Save class names for reference
-    meta = {
-        "classes": list(pipeline.classes_),
-        "training_size": len(deduped),
-        "cv_accuracy": float(scores.mean()),
-        "model_file": "intent_model.joblib",
-    }
-    meta_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "intent_model_meta.json")
-    with open(meta_path, "w") as f:
-        json.dump(meta, f, indent=2)
+    if cached is None:
+        # Save model
+        joblib.dump(pipeline, MODEL_PATH)
+        print(f"\nModel saved to: {MODEL_PATH}")
+        print(f"Model size: {os.path.getsize(MODEL_PATH) / 1024:.1f} KB")
+        export_flat_model(pipeline)
+        print(f"Flat model saved to: {FLAT_MODEL_PATH}")
+        print(f"Flat model size: {os.path.getsize(FLAT_MODEL_PATH) / 1024:.1f} KB")
+
+        # Save class names for reference, plus the corpus fingerprint that
+        # lets the next run skip training
+        meta = {
+            "classes": list(pipeline.classes_),
+            "training_size": len(deduped),
+            "cv_accuracy": cv_accuracy,
+            "model_file": "intent_model.joblib",
+            "flat_model_file": "intent_model.npz",
+            "corpus_hash": digest,
+        }
+        with open(META_PATH, "w") as f:
+            json.dump(meta, f, indent=2)
 
     print(f"\n{'=' * 70}")
     print("  INTENT CLASSIFIER TRAINING COMPLETE")
@@ -6,11 +6,20 @@ Replaces all-MiniLM-L6-v2 (384 dims) embeddings.
 
 import sys
 import os
+import queue
+import threading
 import time
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 from db_config import connect_db
 from embedding_service import EmbeddingService
+from rebuild_indexes import (
+    PIPELINE_DEPTH,
+    _embed_batches,
+    halfvec_available,
+    prepare_embedding_writes,
+    write_embedding_batch,
+)
 
 
 def main():
@@ -25,39 +34,58 @@ def main():
     print("=" * 70)
     print()
 
-    cur.execute("""
-        SELECT id, title, content
-        FROM kb_articles
-        WHERE is_active = true
-        ORDER BY id
-    """)
-    articles = cur.fetchall()
-    total = len(articles)
+    cur.execute("SELECT COUNT(*) FROM kb_articles WHERE is_active = true")
+    total = cur.fetchone()[0]
     print(f"Generating 768-dim embeddings for {total} active articles...\n")
 
+    # Embeddings go through rebuild_indexes' binary COPY staging table: raw
+    # float4s, no per-element text formatting and no precision loss
+    prepare_embedding_writes(cur)
+
     batch_size = 32
     updated = 0
     start = time.time()
 
-    for i in range(0, total, batch_size):
-        batch = articles[i:i + batch_size]
-        ids = [a[0] for a in batch]
-        texts = [f"{a[1]}. {a[2]}" for a in batch]
+    # Stream articles off a server-side cursor (on its own non-autocommit
+    # connection, as named cursors need a transaction) and embed the next
+    # batch while the previous one is written, as rebuild_indexes does
+    read_conn = connect_db()
+    read_cur = read_conn.cursor(name="upgrade_stream")
+    read_cur.itersize = 256
+    read_cur.execute("""
+        SELECT id, title, content
+        FROM kb_articles
+        WHERE is_active = true
+        ORDER BY id
+    """)
+
+    batches = queue.Queue(maxsize=PIPELINE_DEPTH)
+    errors = []
+    producer = threading.Thread(
+        target=_embed_batches,
+        args=(read_cur, embedder, batch_size, batches, errors),
+        daemon=True,
+    )
+    producer.start()
 
-        # Use passage embedding (not query) for document indexing
-        embeddings = embedder.embed_batch(texts, is_query=False)
+    while True:
+        item = batches.get()
+        if item is None:
+            break
+        ids, embeddings = item
 
-        for article_id, embedding in zip(ids, embeddings):
-            embedding_str = "[" + ",".join(f"{x:.6f}" for x in embedding) + "]"
-            cur.execute(
-                "UPDATE kb_articles SET embedding = %s::vector WHERE id = %s",
-                (embedding_str, article_id),
-            )
-            updated += 1
+        write_embedding_batch(cur, ids, embeddings)
+        updated += len(ids)
 
         elapsed = time.time() - start
-        pct = (i + len(batch)) / total * 100
-        print(f"  Progress: {i + len(batch)}/{total} ({pct:.0f}%) — {elapsed:.1f}s elapsed")
+        pct = updated / total * 100
+        print(f"  Progress: {updated}/{total} ({pct:.0f}%) — {elapsed:.1f}s elapsed")
+
+    producer.join()
+    read_cur.close()
+    read_conn.close()
+    if errors:
+        raise errors[0]
 
     elapsed = time.time() - start
     print(f"\n  Embeddings regenerated: {updated} articles in {elapsed:.1f}s")
@@ -65,12 +93,22 @@ def main():
     # Rebuild HNSW index
     print("\nCreating HNSW index (768 dims)...")
     start_idx = time.time()
-    cur.execute("""
-        CREATE INDEX idx_kb_articles_embedding_hnsw
-        ON kb_articles
-        USING hnsw (embedding vector_cosine_ops)
-        WITH (m = 16, ef_construction = 64)
-    """)
+    # Indexed at half precision (halfvec) where pgvector supports it (>= 0.7):
+    # half the size and build memory
+    if halfvec_available(cur):
+        cur.execute(f"""
+            CREATE INDEX idx_kb_articles_embedding_hnsw
+            ON kb_articles
+            USING hnsw ((embedding::halfvec({embedder.dimension})) halfvec_cosine_ops)
+            WITH (m = 16, ef_construction = 64)
+        """)
+    else:
+        cur.execute("""
+            CREATE INDEX idx_kb_articles_embedding_hnsw
+            ON kb_articles
+            USING hnsw (embedding vector_cosine_ops)
+            WITH (m = 16, ef_construction = 64)
+        """)
     idx_time = time.time() - start_idx
     print(f"  HNSW index created in {idx_time:.1f}s")
 
@@ -4,13 +4,18 @@
 from __future__ import annotations
 
 import argparse
-import json
 import os
 import sys
 from typing import Dict
 
+import orjson
+
 from runtime_config import load_runtime_config, validate_runtime_config
 
+# Flags that take no value; an invocation using only these (the usual
+# healthcheck/CI form) skips argparse and validates os.environ as-is
+_BARE_FLAGS = frozenset({"--json", "--check-backends"})
+
 
 
 def _build_environ_from_args(args: argparse.Namespace) -> Dict[str, str]:
@@ -29,7 +34,7 @@ def _build_environ_from_args(args: argparse.Namespace) -> Dict[str, str]:
 
 
 
-def main() -> int:
+def _parse_args(argv) -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Validate Search API runtime configuration")
     parser.add_argument("--environment", help="Override ENVIRONMENT")
     parser.add_argument("--api-key", help="Override ASSISTSUPPORT_API_KEY")
@@ -49,10 +54,22 @@ def main() -> int:
         help="Emit machine-readable JSON output",
     )
 
-    args = parser.parse_args()
-    env = _build_environ_from_args(args)
-    config = load_runtime_config(env)
-    errors = validate_runtime_config(config, check_backends=args.check_backends)
+    return parser.parse_args(argv)
+
+
+
+def main(argv=None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if _BARE_FLAGS.issuperset(argv):
+        as_json = "--json" in argv
+        check_backends = "--check-backends" in argv
+        config = load_runtime_config()
+    else:
+        args = _parse_args(argv)
+        as_json = args.json
+        check_backends = args.check_backends
+        config = load_runtime_config(_build_environ_from_args(args))
+    errors = validate_runtime_config(config, check_backends=check_backends)
 
     payload = {
         "valid": len(errors) == 0,
@@ -62,8 +79,8 @@ def main() -> int:
         "errors": errors,
     }
 
-    if args.json:
-        print(json.dumps(payload, indent=2, sort_keys=True))
+    if as_json:
+        print(orjson.dumps(payload, option=orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS).decode())
     else:
         print(f"valid={payload['valid']}")
         print(f"environment={payload['environment']}")
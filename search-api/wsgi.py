@@ -1,11 +1,19 @@
 #!/usr/bin/env python3
 """WSGI entrypoint for production Search API serving."""
 
-from runtime_config import load_runtime_config, ensure_valid_runtime_config
+from runtime_config import (
+    claim_backend_check,
+    ensure_valid_runtime_config,
+    load_runtime_config,
+)
 
 config = load_runtime_config()
-ensure_valid_runtime_config(config, check_backends=True)
+# Only one worker per server pings the rate-limit backend on cold start
+ensure_valid_runtime_config(config, check_backends=claim_backend_check())
 
-from search_api import app  # noqa: E402
+from search_api import app, _get_engine  # noqa: E402
+
+# Load models and open DB sessions before this worker accepts traffic
+_get_engine()
 
 __all__ = ["app"]